@@ -3,7 +3,7 @@ import os
 from typing import List, Dict
 from dotenv import load_dotenv
 
-from crew_agent import kickoff_triage
+from crew_agent import append_memory, stream_triage
 
 load_dotenv()
 
@@ -13,6 +13,14 @@ st.set_page_config(page_title="Medical Triage Assistant", page_icon="🏥", layo
 def init_state():
 	if 'chat_history' not in st.session_state:
 		st.session_state.chat_history: List[Dict[str, str]] = []
+	if 'memory_text' not in st.session_state:
+		# Prompt memory is maintained turn by turn rather than rebuilt from chat_history
+		st.session_state.memory_text = ""
+
+
+def clear_chat():
+	st.session_state.chat_history.clear()
+	st.session_state.memory_text = ""
 
 
 def header():
@@ -21,21 +29,25 @@ def header():
 		st.warning("GROQ_API_KEY is not set. Create a .env file with your key.")
 
 
+def render_message(msg: Dict[str, str]):
+	avatar = "👤" if msg["role"] == "user" else "🏥"
+	with st.chat_message(msg["role"], avatar=avatar):
+		st.markdown(msg["content"])
+
+
 def render_history():
 	for msg in st.session_state.chat_history:
-		if msg["role"] == "user":
-			st.markdown("**👤 You:**")
-			st.info(msg["content"])
-		else:
-			st.markdown("**🏥 Assistant:**")
-			st.success(msg["content"])
+		render_message(msg)
 
 
-def main():
-	init_state()
-	header()
+@st.fragment
+def render_chat():
+	# Runs as a fragment: Send/Clear only re-execute this function, and a new turn
+	# is appended to the rendered history instead of rerunning the whole script.
+	history = st.container()
+	with history:
+		render_history()
 
-	render_history()
 	user_input = st.text_input(
 		"Describe your symptoms or ask a question:",
 		placeholder="e.g., I have a fever and headache...",
@@ -45,19 +57,31 @@ def main():
 	with col1:
 		send = st.button("Send", type="primary")
 	with col2:
-		if st.button("Clear"):
-			st.session_state.chat_history.clear()
-			st.rerun()
+		# Clearing in the callback happens before the fragment re-renders the history
+		st.button("Clear", on_click=clear_chat)
 
 	if send and user_input.strip():
-		st.session_state.chat_history.append({"role": "user", "content": user_input})
-		with st.spinner("Analyzing..."):
-			try:
-				response = kickoff_triage(user_input, st.session_state.chat_history)
-				st.session_state.chat_history.append({"role": "assistant", "content": response})
-			except Exception as e:
-				st.session_state.chat_history.append({"role": "assistant", "content": f"Error: {e}"})
-		st.rerun()
+		user_msg = {"role": "user", "content": user_input}
+		st.session_state.chat_history.append(user_msg)
+		with history:
+			render_message(user_msg)
+			with st.chat_message("assistant", avatar="🏥"):
+				try:
+					# Tokens are shown as they arrive; write_stream returns the full text once done
+					response = st.write_stream(
+						stream_triage(user_input, memory_text=st.session_state.memory_text)
+					)
+				except Exception as e:
+					response = f"Error: {e}"
+					st.markdown(response)
+		st.session_state.chat_history.append({"role": "assistant", "content": response})
+		st.session_state.memory_text = append_memory(st.session_state.memory_text, user_input, response)
+
+
+def main():
+	init_state()
+	header()
+	render_chat()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,97 @@
+from __future__ import annotations
+
+import json
 import os
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterator, List
 from dotenv import load_dotenv
 
-# CrewAI and LLM
-from crewai import Agent, Task, Crew, Process, LLM
+# CrewAI and litellm take seconds to import, so they are imported on first use rather
+# than when the Streamlit app loads this module
+if TYPE_CHECKING:
+	from crewai import Agent, LLM
 
 
 load_dotenv()
 
+# CrewAI's step-by-step trace is costly to print; opt in with CREW_VERBOSE=1
+VERBOSE = os.getenv("CREW_VERBOSE") == "1"
+
+# Caps simultaneous Groq requests from this process so concurrent Streamlit sessions
+# queue up instead of tripping the per-key rate limits and retrying
+_GROQ_SLOTS = threading.BoundedSemaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", "8")))
+
+# Groq model per latency tier: the 8B model answers most symptom checks,
+# the 70B model is kept for inputs that look serious or complex.
+SPEED_MAP: Dict[str, str] = {
+	"instant": "groq/llama-3.1-8b-instant",
+	"fast70b": "groq/llama-3.3-70b-versatile",
+}
+DEFAULT_TIER = "instant"
+ESCALATION_TIER = "fast70b"
+# Inputs longer than this (in words) or mentioning a red flag escalate to the larger model
+_ESCALATE_WORD_COUNT = 80
+_RED_FLAG_TERMS = (
+	"severe", "chest pain", "breathing", "breathless", "shortness of breath",
+	"vision loss", "faint", "unconscious", "seizure", "blood", "high fever",
+)
+# Past turns are clipped so the memory block stays small; prompt length drives Groq TTFT
+_MEMORY_TURN_CHARS = 400
+_MEMORY_TOTAL_CHARS = 1500
+# Finished answers kept for repeat questions, shared by the streamed and CrewAI paths
+_RESPONSE_CACHE_SIZE = 256
+# Cases per batched Groq call; larger batches trade answer quality for fewer round-trips
+BATCH_SIZE = 8
+_BATCH_MAX_TOKENS = 4096
+_BATCH_FIELDS = (
+	("diagnosis_summary", "Diagnosis Summary"),
+	("confirmatory_steps", "Confirmatory Steps"),
+	("treatment_guide", "Treatment Guide"),
+	("escalation_flags", "Escalation Flags"),
+	("educational_sidebar", "Educational Sidebar"),
+	("disclaimer", "Disclaimer"),
+)
+_TRIAGE_BACKSTORY = (
+	"You are a specialized virtual medical triage assistant. You analyze symptom patterns, "
+	"identify potential conditions from a predefined list, and provide clear, educational guidance. "
+	"Always emphasize that outputs are for demo/educational purposes only and not medical advice."
+)
+_TRIAGE_EXPECTED_OUTPUT = (
+	"A structured medical triage response that strictly follows the specified Output Format "
+	"including Diagnosis Summary, Confirmatory Steps, Treatment Guide, Escalation Flags, "
+	"Educational Sidebar, and the required Disclaimer."
+)
 
+
+@lru_cache(maxsize=1)
 def _read_system_prompt() -> str:
 	with open("react_prompt.txt", "r", encoding="utf-8") as f:
 		return f.read().strip()
 
 
+def _clip_turn(content: str) -> str:
+	if len(content) > _MEMORY_TURN_CHARS:
+		return content[:_MEMORY_TURN_CHARS].rstrip() + "..."
+	return content
+
+
+def append_memory(memory_text: str, user: str, assistant: str) -> str:
+	"""
+	Append one User/Assistant exchange to a running memory string and return it.
+	The oldest exchanges are dropped once the string exceeds the memory budget, so callers
+	can keep the result between turns instead of rebuilding it from the whole chat history.
+	"""
+	memory_text += f"User: {_clip_turn(user)}\nAssistant: {_clip_turn(assistant)}\n\n"
+	if len(memory_text) > _MEMORY_TOTAL_CHARS:
+		memory_text = memory_text[-_MEMORY_TOTAL_CHARS:]
+		# Resume at the next whole exchange rather than mid-sentence
+		start = memory_text.find("User: ")
+		memory_text = memory_text[start:] if start != -1 else ""
+	return memory_text
+
+
 def _format_memory_from_history(chat_history: List[Dict[str, str]]) -> str:
 	# chat_history: list of {"role": "user"|"assistant", "content": str}
 	if not chat_history:
@@ -24,7 +102,7 @@ def _format_memory_from_history(chat_history: List[Dict[str, str]]) -> str:
 	current_user = None
 	for msg in temp:
 		role = msg.get("role", "")
-		content = msg.get("content", "")
+		content = _clip_turn(msg.get("content", ""))
 		if role == "user":
 			current_user = content
 		elif role == "assistant" and current_user is not None:
@@ -32,71 +110,280 @@ def _format_memory_from_history(chat_history: List[Dict[str, str]]) -> str:
 			current_user = None
 	if not pairs:
 		return ""
-	return "\n\nPrevious Conversation Context (last up to 5):\n" + "\n\n".join(pairs[-5:]) + "\n\n"
+	# Keep the most recent pairs that fit in the overall budget
+	kept: List[str] = []
+	total = 0
+	for pair in reversed(pairs[-5:]):
+		total += len(pair)
+		if kept and total > _MEMORY_TOTAL_CHARS:
+			break
+		kept.append(pair)
+	kept.reverse()
+	return "\n\nPrevious Conversation Context (last up to 5):\n" + "\n\n".join(kept) + "\n\n"
+
+
+def _select_tier(user_input: str) -> str:
+	text = user_input.lower()
+	if len(text.split()) > _ESCALATE_WORD_COUNT or any(term in text for term in _RED_FLAG_TERMS):
+		return ESCALATION_TIER
+	return DEFAULT_TIER
+
+
+def _resolve_tier(user_input: str, tier: str | None) -> str:
+	if tier is None:
+		return _select_tier(user_input)
+	if tier not in SPEED_MAP:
+		raise ValueError(f"Unknown tier '{tier}', expected one of {list(SPEED_MAP)}")
+	return tier
+
+
+_DESCRIPTION_TAIL = "\n\nPlease respond using the exact Output Format and Tone & Style specified in the system prompt."
+
+
+@lru_cache(maxsize=1)
+def _description_head() -> str:
+	# The system prompt never changes, so the fixed prefix of every task description is built once
+	return _read_system_prompt() + "\n\n"
 
 
-def _get_llm() -> LLM:
+def _build_description(
+	user_input: str,
+	chat_history: List[Dict[str, str]] | None,
+	memory_text: str | None = None,
+) -> str:
+	if memory_text is None:
+		memory_text = _format_memory_from_history(chat_history or [])
+	elif memory_text:
+		memory_text = "\n\nPrevious Conversation Context:\n" + memory_text
+
+	return "".join((_description_head(), memory_text, "\nCurrent User Input:\n", user_input, _DESCRIPTION_TAIL))
+
+
+def _get_api_key() -> str:
+	import httpx
+	import litellm
+
 	api_key = os.getenv("GROQ_API_KEY")
 	if not api_key:
 		raise ValueError("GROQ_API_KEY environment variable is required")
-	# Use the user's requested Groq model
+	# Share one keep-alive connection pool so repeat calls skip the TLS handshake to Groq
+	if litellm.client_session is None:
+		litellm.client_session = httpx.Client(
+			transport=httpx.HTTPTransport(retries=1),
+			limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+		)
+	return api_key
+
+
+@lru_cache(maxsize=None)
+def _get_llm(tier: str = DEFAULT_TIER, max_tokens: int = 512) -> LLM:
+	from crewai import LLM
+
+	api_key = _get_api_key()
 	return LLM(
-		model="groq/llama-3.3-70b-versatile",
+		model=SPEED_MAP[tier],
 		api_key=api_key,
+		# Deterministic output so repeated questions can be served from the response cache
+		temperature=0,
+		# The structured triage answer fits comfortably; stop Groq from generating past it
+		max_tokens=max_tokens,
 	)
 
 
-def kickoff_triage(user_input: str, chat_history: List[Dict[str, str]] | None = None) -> str:
-	"""
-	Run the CrewAI medical triage agent with the given user input and optional chat history.
-	- user_input: the user's latest message
-	- chat_history: list of dicts [{"role": "user"|"assistant", "content": str}], used to build memory
-	Returns the structured medical triage response as a string.
-	"""
-	system_prompt = _read_system_prompt()
-	memory_text = _format_memory_from_history(chat_history or [])
-
-	llm = _get_llm()
+@lru_cache(maxsize=None)
+def _get_agent(tier: str = DEFAULT_TIER, max_tokens: int = 512) -> Agent:
+	# Built once per process and tier; only the Task and Crew are created per request
+	from crewai import Agent
 
-	agent = Agent(
+	return Agent(
 		role="Virtual Medical Triage Assistant",
 		goal="Analyze symptoms and provide safe, structured medical guidance",
-		backstory=(
-			"You are a specialized virtual medical triage assistant. You analyze symptom patterns, "
-			"identify potential conditions from a predefined list, and provide clear, educational guidance. "
-			"Always emphasize that outputs are for demo/educational purposes only and not medical advice."
-		),
+		backstory=_TRIAGE_BACKSTORY,
 		allow_delegation=False,
-		verbose=True,
-		llm=llm,
+		verbose=VERBOSE,
+		llm=_get_llm(tier, max_tokens),
 	)
 
-	description = f"""
-{system_prompt}
-
-{memory_text}
-Current User Input:
-{user_input}
 
-Please respond using the exact Output Format and Tone & Style specified in the system prompt.
-"""
+def _run_crew(agent: Agent, description: str, expected_output: str) -> str:
+	from crewai import Crew, Process, Task
 
 	task = Task(
-		description=description.strip(),
+		description=description,
 		agent=agent,
-		expected_output=(
-			"A structured medical triage response that strictly follows the specified Output Format "
-			"including Diagnosis Summary, Confirmatory Steps, Treatment Guide, Escalation Flags, "
-			"Educational Sidebar, and the required Disclaimer."
-		),
+		expected_output=expected_output,
 	)
 
 	crew = Crew(
 		agents=[agent],
 		tasks=[task],
 		process=Process.sequential,
-		verbose=True,
+		verbose=VERBOSE,
 	)
 
-	result = crew.kickoff()
+	with _GROQ_SLOTS:
+		result = crew.kickoff()
 	return str(result).strip()
+
+
+# Keyed on (description, tier); the description embeds the system prompt, memory and user input
+_response_cache: OrderedDict[tuple, str] = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def _cached_response(key: tuple) -> str | None:
+	with _response_cache_lock:
+		response = _response_cache.get(key)
+		if response is not None:
+			_response_cache.move_to_end(key)
+		return response
+
+
+def _store_response(key: tuple, response: str) -> None:
+	with _response_cache_lock:
+		_response_cache[key] = response
+		_response_cache.move_to_end(key)
+		while len(_response_cache) > _RESPONSE_CACHE_SIZE:
+			_response_cache.popitem(last=False)
+
+
+def _parse_batch_response(raw: str, expected: int) -> List[str] | None:
+	# The model may wrap the array in prose or a code fence; take the outermost [...]
+	start, end = raw.find("["), raw.rfind("]")
+	if start == -1 or end <= start:
+		return None
+	try:
+		items = json.loads(raw[start:end + 1])
+	except json.JSONDecodeError:
+		return None
+	if not isinstance(items, list) or len(items) != expected:
+		return None
+	if not all(isinstance(item, dict) for item in items):
+		return None
+
+	responses: List[str] = []
+	for item in items:
+		sections: List[str] = []
+		for key, title in _BATCH_FIELDS:
+			value = item.get(key, "")
+			if isinstance(value, list):
+				value = "\n".join(f"- {entry}" for entry in value)
+			sections.append(f"**{title}:**\n{value}".strip())
+		responses.append("\n\n".join(sections))
+	return responses
+
+
+def kickoff_triage(
+	user_input: str,
+	chat_history: List[Dict[str, str]] | None = None,
+	tier: str | None = None,
+	memory_text: str | None = None,
+) -> str:
+	"""
+	Run the CrewAI medical triage agent with the given user input and optional chat history.
+	- user_input: the user's latest message
+	- chat_history: list of dicts [{"role": "user"|"assistant", "content": str}], used to build memory
+	- tier: a SPEED_MAP key; by default the 8B model is used unless the input warrants escalation
+	- memory_text: a running memory string from append_memory; used instead of chat_history when given
+	Returns the structured medical triage response as a string.
+	Identical (system prompt, memory, input) combinations are answered from an in-process LRU cache.
+	The chat UI streams through stream_triage instead; this is the non-streaming entry point,
+	also used by kickoff_triage_batch for cases whose batched answer cannot be parsed.
+	"""
+	tier = _resolve_tier(user_input, tier)
+	key = (_build_description(user_input, chat_history, memory_text), tier)
+	response = _cached_response(key)
+	if response is None:
+		response = _run_crew(_get_agent(tier), key[0], _TRIAGE_EXPECTED_OUTPUT)
+		_store_response(key, response)
+	return response
+
+
+def stream_triage(
+	user_input: str,
+	chat_history: List[Dict[str, str]] | None = None,
+	tier: str | None = None,
+	memory_text: str | None = None,
+) -> Iterator[str]:
+	"""
+	Stream the triage response token by token for display with st.write_stream.
+	Takes the same arguments as kickoff_triage but calls Groq directly through litellm,
+	since CrewAI only returns the answer once generation has finished.
+	Shares kickoff_triage's response cache: a repeat question is yielded whole at once,
+	and a stream that runs to the end is stored for the next one.
+	"""
+	import litellm
+
+	tier = _resolve_tier(user_input, tier)
+	key = (_build_description(user_input, chat_history, memory_text), tier)
+	cached = _cached_response(key)
+	if cached is not None:
+		yield cached
+		return
+
+	# The slot covers opening the request only. Holding it across the yields below would keep
+	# it taken for as long as the consumer, e.g. until an abandoned generator is collected.
+	with _GROQ_SLOTS:
+		response = litellm.completion(
+			model=SPEED_MAP[tier],
+			api_key=_get_api_key(),
+			messages=[
+				{"role": "system", "content": _TRIAGE_BACKSTORY},
+				{"role": "user", "content": key[0]},
+			],
+			temperature=0,
+			max_tokens=512,
+			stream=True,
+		)
+	parts: List[str] = []
+	for chunk in response:
+		delta = chunk.choices[0].delta.content
+		if delta:
+			parts.append(delta)
+			yield delta
+	_store_response(key, "".join(parts).strip())
+
+
+def kickoff_triage_batch(inputs: List[str], tier: str | None = None) -> List[str]:
+	"""
+	Triage several independent cases with one Groq call per BATCH_SIZE cases.
+	- inputs: one symptom description per case; no chat history is shared between cases
+	- tier: a SPEED_MAP key; by default a chunk escalates if any of its cases would
+	Returns one structured triage response per input, in input order. A chunk whose
+	JSON answer cannot be parsed is retried case by case through kickoff_triage.
+	"""
+	if tier is not None and tier not in SPEED_MAP:
+		raise ValueError(f"Unknown tier '{tier}', expected one of {list(SPEED_MAP)}")
+
+	system_prompt = _read_system_prompt()
+	field_names = ", ".join(key for key, _ in _BATCH_FIELDS)
+	responses: List[str] = []
+
+	for offset in range(0, len(inputs), BATCH_SIZE):
+		chunk = inputs[offset:offset + BATCH_SIZE]
+		chunk_tier = tier
+		if chunk_tier is None:
+			chunk_tier = ESCALATION_TIER if ESCALATION_TIER in map(_select_tier, chunk) else DEFAULT_TIER
+
+		cases = "\n".join(f"Case {i}: {text}" for i, text in enumerate(chunk, 1))
+		description = f"""
+{system_prompt}
+
+Triage each of the following {len(chunk)} cases independently.
+Return only a JSON array with one object per case, in order, with the keys:
+case_id (the case number), {field_names}.
+
+{cases}
+""".strip()
+
+		raw = _run_crew(
+			_get_agent(chunk_tier, _BATCH_MAX_TOKENS),
+			description,
+			f"A JSON array of {len(chunk)} objects, one structured triage response per case.",
+		)
+		parsed = _parse_batch_response(raw, len(chunk))
+		if parsed is None:
+			parsed = [kickoff_triage(text, tier=chunk_tier) for text in chunk]
+		responses.extend(parsed)
+
+	return responses
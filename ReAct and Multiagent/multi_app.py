@@ -1,10 +1,18 @@
 import streamlit as st
 
-from mutliagents import execute
+from mutliagents import build_editorial_resources, execute
 
 
 st.set_page_config(page_title="Editorial Crew Chat", page_icon="📝", layout="wide")
 
+
+@st.cache_resource(ttl=24 * 60 * 60)
+def get_editorial_resources():
+    # The LLM and web tools survive script reruns and are shared across sessions;
+    # agents, tasks and the Crew hold per-run state, so execute builds them for each article
+    return build_editorial_resources()
+
+
 st.title("📝 Multiagent Editorial Crew")
 st.caption(
     "Chat with a mini editorial team that researches, outlines, writes, fact-checks, and edits technical articles."
@@ -32,7 +40,7 @@ if prompt:
     with st.chat_message("assistant"):
         with st.spinner("The crew is working on your article…"):
             try:
-                result_md = execute(prompt)
+                result_md = execute(prompt, get_editorial_resources())
             except Exception as e:
                 result_md = f"**Error:** {e}"
         st.markdown(result_md)
@@ -1,86 +1,194 @@
-from crewai import Agent, Task, Crew, LLM, Process
-from crewai_tools import SerperDevTool, WebsiteSearchTool
 import os
+import threading
+from contextvars import ContextVar
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-llm = LLM(model="groq/llama-3.3-70b-versatile", api_key=os.getenv("GROQ_API_KEY"))
-
-serper_tool = SerperDevTool(api_key=os.getenv("SERPER_API_KEY"))
-website_tool = WebsiteSearchTool()
-
-orchestrator = Agent(
-    role="Orchestrator",
-    goal="Coordinate the research, outlining, writing, fact-checking, and editing to deliver a polished technical article. You have to delegate work to every subagent given to you to complete the task.",
-    backstory="You are an experienced editor-in-chief who delegates effectively, ensures quality, and keeps the team on schedule.",
-    allow_delegation=True,
-    verbose=True,
-    llm=llm,
-)
-
-researcher = Agent(
-    role="Researcher",
-    goal="Find recent, credible sources and summarize actionable insights for the topic.",
-    backstory="You are a meticulous technical researcher who prioritizes reputable sources, recency, and clarity of notes.",
-    tools=[serper_tool, website_tool],
-    allow_delegation=False,
-    verbose=True,
-    llm=llm,
-)
-
-outliner = Agent(
-    role="Outliner",
-    goal="Transform research notes into a coherent, detailed outline with logical structure and clear section objectives.",
-    backstory="You structure complex information into digestible, well-ordered sections tailored for technical audiences.",
-    allow_delegation=False,
-    verbose=True,
-    llm=llm,
-)
-
-writer = Agent(
-    role="Writer",
-    goal="Draft a comprehensive, accurate, and engaging article based on the outline while maintaining technical clarity.",
-    backstory="You are a senior technical writer with strong exposition skills and code-first explanations where relevant.",
-    allow_delegation=False,
-    verbose=True,
-    llm=llm,
-)
-
-fact_checker = Agent(
-    role="Fact-Checker",
-    goal="Verify claims, cite reputable sources, and correct inaccuracies to ensure credibility and consistency.",
-    backstory="You are an exacting reviewer who validates every claim against reliable, up-to-date sources.",
-    tools=[serper_tool, website_tool],
-    allow_delegation=False,
-    verbose=True,
-    llm=llm,
-)
-
-editor = Agent(
-    role="Editor",
-    goal="Polish the article for grammar, clarity, flow, tone, and structure while preserving technical accuracy.",
-    backstory="You are a seasoned editor who elevates readability and engagement without sacrificing precision.",
-    allow_delegation=False,
-    verbose=True,
-    llm=llm,
-)
-
-def execute(user_input: str):
-    user_task = Task(
-        description="Write a technical article about a topic that will be provided to you by the user. The article should be in Markdown format with headings, code blocks where relevant, and a conclusion. Topic: \n\n" + user_input,
-        expected_output="A complete article in Markdown with headings, code blocks where relevant, and a conclusion.",
-        agent=orchestrator,
+# CrewAI's step-by-step trace is costly to print; opt in with CREW_VERBOSE=1
+VERBOSE = os.getenv("CREW_VERBOSE") == "1"
+
+# Caps simultaneous article runs in this process so concurrent Streamlit sessions
+# share the Groq rate limits instead of all hitting them at once
+_CREW_SLOTS = threading.BoundedSemaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", "8")))
+
+# Results of web lookups made during the current execute() run. The researcher and
+# the fact-checker often hit the same queries and URLs, so repeats are served from here.
+# Each run sets its own dict, so concurrent runs never see or clear each other's results.
+_run_tool_cache = ContextVar("run_tool_cache", default=None)
+
+
+def _tool_cache_key(tool_name, kwargs):
+    return (tool_name,) + tuple(sorted((k, str(v).strip().lower()) for k, v in kwargs.items()))
+
+
+def _cached_tool_run(tool_name, run, kwargs):
+    cache = _run_tool_cache.get()
+    if cache is None:
+        # Called outside execute() (or on a thread that did not inherit the run's context)
+        return run(**kwargs)
+    key = _tool_cache_key(tool_name, kwargs)
+    if key not in cache:
+        cache[key] = run(**kwargs)
+    return cache[key]
+
+
+def build_editorial_resources():
+    """
+    Build the LLM and web tools the editorial agents use, as (llm, tools). They keep no
+    per-run state, so callers should build them once and share them between runs.
+    """
+    # CrewAI, its tools and litellm are slow to import, so the cost is paid here on the
+    # first article request instead of when the Streamlit page first loads
+    import httpx
+    import litellm
+    from crewai import LLM
+    from crewai_tools import SerperDevTool, WebsiteSearchTool
+
+    # Reuse keep-alive connections to Groq across all agents' LLM calls. The session is
+    # process-wide, so one already installed (e.g. by crew_agent) is kept rather than replaced
+    if litellm.client_session is None:
+        litellm.client_session = httpx.Client(
+            transport=httpx.HTTPTransport(retries=1),
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+        )
+
+    class CachedSerperDevTool(SerperDevTool):
+        def _run(self, **kwargs):
+            return _cached_tool_run("serper", super()._run, kwargs)
+
+    class CachedWebsiteSearchTool(WebsiteSearchTool):
+        def _run(self, **kwargs):
+            return _cached_tool_run("website", super()._run, kwargs)
+
+    llm = LLM(model="groq/llama-3.3-70b-versatile", api_key=os.getenv("GROQ_API_KEY"))
+
+    serper_tool = CachedSerperDevTool(api_key=os.getenv("SERPER_API_KEY"))
+    website_tool = CachedWebsiteSearchTool()
+
+    return llm, [serper_tool, website_tool]
+
+
+def build_editorial_crew(llm, tools):
+    """
+    Build the editorial agents, their tasks and the Crew for one run. CrewAI writes the
+    interpolated topic and the task outputs onto these objects during kickoff, so a
+    Crew must not be shared between concurrent runs.
+    """
+    from crewai import Agent, Task, Crew, Process
+
+    orchestrator = Agent(
+        role="Orchestrator",
+        goal="Coordinate the research, outlining, writing, fact-checking, and editing to deliver a polished technical article. You have to delegate work to every subagent given to you to complete the task.",
+        backstory="You are an experienced editor-in-chief who delegates effectively, ensures quality, and keeps the team on schedule.",
+        allow_delegation=True,
+        verbose=VERBOSE,
+        llm=llm,
+    )
+
+    researcher = Agent(
+        role="Researcher",
+        goal="Find recent, credible sources and summarize actionable insights for the topic.",
+        backstory="You are a meticulous technical researcher who prioritizes reputable sources, recency, and clarity of notes.",
+        tools=tools,
+        allow_delegation=False,
+        verbose=VERBOSE,
+        llm=llm,
     )
 
+    outliner = Agent(
+        role="Outliner",
+        goal="Transform research notes into a coherent, detailed outline with logical structure and clear section objectives.",
+        backstory="You structure complex information into digestible, well-ordered sections tailored for technical audiences.",
+        allow_delegation=False,
+        verbose=VERBOSE,
+        llm=llm,
+    )
+
+    writer = Agent(
+        role="Writer",
+        goal="Draft a comprehensive, accurate, and engaging article based on the outline while maintaining technical clarity.",
+        backstory="You are a senior technical writer with strong exposition skills and code-first explanations where relevant.",
+        allow_delegation=False,
+        verbose=VERBOSE,
+        llm=llm,
+    )
+
+    fact_checker = Agent(
+        role="Fact-Checker",
+        goal="Verify claims, cite reputable sources, and correct inaccuracies to ensure credibility and consistency.",
+        backstory="You are an exacting reviewer who validates every claim against reliable, up-to-date sources.",
+        tools=tools,
+        allow_delegation=False,
+        verbose=VERBOSE,
+        llm=llm,
+    )
+
+    editor = Agent(
+        role="Editor",
+        goal="Polish the article for grammar, clarity, flow, tone, and structure while preserving technical accuracy.",
+        backstory="You are a seasoned editor who elevates readability and engagement without sacrificing precision.",
+        allow_delegation=False,
+        verbose=VERBOSE,
+        llm=llm,
+    )
+
+    # One task per specialist with explicit dependencies, so the manager can hand each
+    # step to the right agent instead of a single orchestrator task running them all.
+    research_task = Task(
+        description="Research the topic below. Collect recent, credible sources and summarize the key facts, concepts, and examples a technical article on it should cover. Topic: \n\n{topic}",
+        expected_output="Research notes as bullet points, each with its source URL.",
+        agent=researcher,
+    )
+
+    outline_task = Task(
+        description="Using the research notes, produce a detailed outline for a technical article on: {topic}",
+        expected_output="A Markdown outline with section headings and the objective of each section.",
+        agent=outliner,
+        context=[research_task],
+    )
+
+    draft_task = Task(
+        description="Write the full technical article on {topic} following the outline and drawing on the research notes. Use Markdown with headings, code blocks where relevant, and a conclusion.",
+        expected_output="A complete article draft in Markdown.",
+        agent=writer,
+        context=[research_task, outline_task],
+    )
+
+    fact_check_task = Task(
+        description="Verify the claims in the article draft on {topic} against reliable sources and list every correction needed.",
+        expected_output="A list of verified claims and required corrections, with sources.",
+        agent=fact_checker,
+        context=[draft_task],
+    )
+
+    edit_task = Task(
+        description="Apply the fact-check corrections to the draft on {topic} and polish it for grammar, clarity, flow, and structure.",
+        expected_output="A complete article in Markdown with headings, code blocks where relevant, and a conclusion.",
+        agent=editor,
+        context=[draft_task, fact_check_task],
+    )
 
     final_crew = Crew(
-        agents=[orchestrator, researcher, outliner, writer, fact_checker, editor],
-        tasks=[user_task],
-        process=Process.sequential,
-        verbose=True,
+        agents=[researcher, outliner, writer, fact_checker, editor],
+        tasks=[research_task, outline_task, draft_task, fact_check_task, edit_task],
+        process=Process.hierarchical,
+        manager_agent=orchestrator,
+        verbose=VERBOSE,
     )
 
-    kickoff_result = final_crew.kickoff()
+    return final_crew
+
+
+def execute(user_input: str, resources=None):
+    """Write an article on user_input; resources is a shared (llm, tools) pair from build_editorial_resources"""
+    llm, tools = resources if resources is not None else build_editorial_resources()
+    crew = build_editorial_crew(llm, tools)
+    with _CREW_SLOTS:
+        token = _run_tool_cache.set({})
+        try:
+            kickoff_result = crew.kickoff(inputs={"topic": user_input})
+        finally:
+            _run_tool_cache.reset(token)
     return kickoff_result.raw
\ No newline at end of file
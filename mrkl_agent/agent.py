@@ -1,31 +1,343 @@
 import os
 import re
-import requests
+import operator
 import json
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from tools import TOOLS
 from dotenv import load_dotenv
-from reflector_agent import ReflectorAgent
 
 # Load environment variables
 load_dotenv()
 
+# Patterns used on every query, compiled once at import time
+_REPEAT_RE = re.compile(r'(.{1,3})\1{4,}')  # Same 1-3 chars repeated 4+ times
+# Keyboard mashing: only y and h, or only letters from one keyboard row.
+# One alternation, so a query is matched in a single call rather than four.
+_RANDOM_RE = re.compile(r'^(?:[yh]+|[qwerty]+|[asdfgh]+|[zxcvbn]+)$')
+_NONALPHA_RE = re.compile(r'[^a-zA-Z]')
+_WORD_RE = re.compile(r'[a-zA-Z]{3,}')
+_MATH_EXPR_RE = re.compile(r'[\d\+\-\*\/\(\)\.\s\^]+')
+_NUM_RE = re.compile(r'\d+\.?\d*')
+_MATH_OPS = frozenset('+-*/')
+_NON_ALPHA_BYTES = bytes(c for c in range(256) if not (65 <= c <= 90 or 97 <= c <= 122))
+_WEATHER_PATTERNS = [
+    re.compile(r'weather (?:in|of) ([a-zA-Z\s]+?)(?:\?|$|,)'),
+    re.compile(r'(?:in|of) ([a-zA-Z\s]+?)(?:\?|$|,)'),
+    re.compile(r'([a-zA-Z\s]+?) weather'),
+]
+_ART_RE = re.compile(r'^(the|a|an)\s+')
+_HW_EVENT_RE = re.compile(r'current|event|happening')
+
+# Word lists, built once and shared across queries
+_COMMON_WORDS = frozenset({
+    'the', 'and', 'is', 'in', 'to', 'of', 'a', 'that', 'it', 'with', 'for', 'as', 'was', 'on', 'are', 'you', 'this', 'be', 'at', 'have', 'or', 'not', 'from', 'by', 'they', 'we', 'say', 'her', 'she', 'an', 'each', 'which', 'do', 'how', 'their', 'if', 'will', 'up', 'other', 'about', 'out', 'many', 'then', 'them', 'these', 'so', 'some', 'what', 'would', 'make', 'like', 'into', 'time', 'has', 'two', 'more', 'go', 'no', 'way', 'could', 'my', 'than', 'first', 'been', 'call', 'who', 'oil', 'its', 'now', 'find', 'long', 'down', 'day', 'did', 'get', 'come', 'made', 'may', 'part', 'weather', 'calculate', 'news', 'search', 'tell', 'me', 'what', 'when', 'where', 'why', 'how', 'university', 'heriot', 'watt'
+})
+# Extended list of cities and countries, in match order
+_LOCATIONS = (
+    'london', 'paris', 'tokyo', 'new york', 'mumbai', 'berlin', 'delhi', 'sydney', 'toronto',
+    'dubai', 'abu dhabi', 'uae', 'united arab emirates', 'india', 'usa', 'uk', 'canada',
+    'germany', 'france', 'japan', 'australia', 'singapore', 'hong kong', 'bangkok',
+    'moscow', 'rome', 'madrid', 'amsterdam', 'zurich', 'istanbul', 'cairo', 'riyadh'
+)
+# Single-word names are found by token lookup, multi-word ones by substring scan;
+# when several match, the earliest entry in _LOCATIONS wins
+_LOCATION_INDEX = {location: i for i, location in enumerate(_LOCATIONS)}
+_SINGLE_WORD_LOCS = frozenset(location for location in _LOCATIONS if ' ' not in location)
+_MULTI_WORD_LOCS = tuple(location for location in _LOCATIONS if ' ' in location)
+_UAE_NAMES = frozenset({'uae', 'united arab emirates'})
+_NOT_LOCATIONS = frozenset({'weather', 'temperature', 'forecast'})
+_NOT_PROPER_NOUNS = frozenset({'weather', 'what', 'is', 'the'})
+_SEARCH_STOPWORDS = frozenset({'what', 'is', 'tell', 'me', 'about', 'explain', 'define', 'the'})
+_NEWS_STOPWORDS = frozenset({'get', 'me', 'the', 'some', 'find'})
+
+# Tool names returned by think(); they match the keys of tools.TOOLS
+_TOOL_CALC = 'calculator'
+_TOOL_WEATHER = 'weather'
+_TOOL_NEWS = 'news'
+_TOOL_SEARCH = 'search'
+_TOOL_INVALID = 'invalid'
+
+# Tool routing keywords, highest priority first
+_TOOL_ROUTES = (
+    (_TOOL_CALC, ('calculate', 'math', '+', '-', '*', '/', '=', 'sum', 'multiply', 'divide', 'compute', 'formula'),
+     "Detected mathematical operations - selecting Calculator tool"),
+    (_TOOL_WEATHER, ('weather', 'temperature', 'rain', 'sunny', 'climate', 'forecast', 'humidity', 'wind'),
+     "Detected weather-related query - selecting Weather tool"),
+    (_TOOL_NEWS, ('news', 'latest', 'recent', 'current events', 'breaking', 'today', 'yesterday', 'happening'),
+     "Detected news/current events request - selecting News tool"),
+    (_TOOL_SEARCH, ('what is', 'tell me about', 'define', 'explain', 'information', 'who is', 'when did', 'where is', 'how does'),
+     "Detected general information request - selecting Search tool"),
+)
+_KEYWORD_PRIORITY = {
+    keyword: priority
+    for priority, (_, keywords, _) in enumerate(_TOOL_ROUTES)
+    for keyword in keywords
+}
+# One scan over the query: the lookahead reports a keyword at every position,
+# and alternatives are ordered by priority so ties at a position go to the
+# higher-priority tool.
+_ROUTE_RE = re.compile('(?=(' + '|'.join(
+    re.escape(keyword) for keyword in sorted(_KEYWORD_PRIORITY, key=_KEYWORD_PRIORITY.get)
+) + '))')
+
+@lru_cache(maxsize=1024)
+def _select_tool(query_lower):
+    """Pick the highest-priority tool whose keywords appear anywhere in the query"""
+    best = len(_TOOL_ROUTES)
+    for match in _ROUTE_RE.finditer(query_lower):
+        best = min(best, _KEYWORD_PRIORITY[match.group(1)])
+        if best == 0:
+            break
+    
+    if best < len(_TOOL_ROUTES):
+        selected_tool, _, reasoning = _TOOL_ROUTES[best]
+        return selected_tool, reasoning
+    
+    # Default to search for any other queries
+    return _TOOL_SEARCH, "General query detected - defaulting to Search tool for comprehensive information"
+
+def _char_stats(text):
+    """Return (unique, letters, vowels, consonants) character counts for a lowercased query"""
+    # Strip everything but ASCII letters in one C-level pass, then count vowels
+    # as the bytes a second pass deletes (one table scan instead of five counts)
+    letters = text.encode('ascii', 'ignore').translate(None, _NON_ALPHA_BYTES)
+    vowels = len(letters) - len(letters.translate(None, b'aeiou'))
+    return len(set(text)), len(letters), vowels, len(letters) - vowels
+
+@lru_cache(maxsize=2048)
+def _is_meaningless(query_lower):
+    """Detect if the query appears to be random characters or meaningless"""
+    # Remove surrounding whitespace (the caller has already lowercased)
+    cleaned_query = query_lower.strip()
+    
+    # If query is too short (less than 3 characters), likely meaningless
+    if len(cleaned_query) < 3:
+        return True
+    
+    # Gather every character statistic the checks below need in one place
+    unique_count, letter_count, vowel_count, consonant_count = _char_stats(cleaned_query)
+    
+    # Check if query contains only repeated characters (like "aaaaa" or "yuyuyu")
+    if unique_count <= 2 and len(cleaned_query) > 5:
+        return True
+    
+    # Check if query uses very limited character set with suspicious repetition
+    if len(cleaned_query) > 10 and unique_count <= 4:
+        # If most characters appear many times, it's likely random mashing
+        # (at most four distinct characters, so a few C-level counts suffice)
+        max_count = max(map(cleaned_query.count, set(cleaned_query)))
+        if max_count >= len(cleaned_query) * 0.3:  # Any char appears 30%+ of time
+            return True
+    
+    # Check for excessive repetition of small patterns
+    if _REPEAT_RE.search(cleaned_query):
+        return True
+    
+    # Check if query has suspicious patterns
+    if letter_count > 5:  # Only check if enough letters
+        # If no vowels in a word longer than 5 characters, likely random
+        if vowel_count == 0 and consonant_count > 5:
+            return True
+        
+        # If ratio of consonants to vowels is extremely high, likely random
+        if vowel_count > 0 and (consonant_count / vowel_count) > 8:
+            return True
+    
+    # Check if query contains random character patterns
+    if len(cleaned_query) > 8 and _RANDOM_RE.match(cleaned_query):
+        return True
+    
+    # Check for lack of dictionary-like words
+    # If query is long but has no recognizable words, likely meaningless
+    if len(cleaned_query) > 10:
+        # Only runs of 3+ letters can count; stop at the first recognizable one
+        if not any(word in _COMMON_WORDS or len(word) >= 4
+                   for word in _WORD_RE.findall(cleaned_query)):
+            return True
+    
+    # Check for specific repetitive patterns that indicate random input
+    # Look for alternating or repetitive character sequences
+    # (most expensive check, so it only runs once the cheap ones pass)
+    query_length = len(cleaned_query)
+    if query_length > 10:
+        # Check for patterns like "yuhyuhyuh" or "gugugu"
+        for i in range(2, 6):  # Check pattern lengths 2-5
+            repetitions = query_length // i
+            if repetitions >= 3:  # If pattern repeats 3+ times
+                # zip stops at the tiled prefix's length, so it needs no trimming
+                reconstructed = cleaned_query[:i] * repetitions
+                similarity = sum(map(operator.eq, cleaned_query, reconstructed))
+                similarity_ratio = similarity / query_length
+                if similarity_ratio > 0.7:  # 70% similarity indicates repetitive pattern
+                    return True
+    
+    return False
+
+@lru_cache(maxsize=1024)
+def _extract_parameters(query, query_lower, tool_name):
+    """Extract relevant parameters from query for the selected tool"""
+    # Tokenize once; the word-based branches below share it
+    tokens = query_lower.split()
+    
+    if tool_name == _TOOL_CALC:
+        # Extract mathematical expression
+        # Look for mathematical patterns
+        # Keep only the longest (first on ties) run instead of every match
+        best = None
+        best_len = 0
+        for match in _MATH_EXPR_RE.finditer(query):
+            if match.end() - match.start() > best_len:
+                best_len = match.end() - match.start()
+                best = match
+        if best is not None:
+            expr = best.group().strip()
+            if not _MATH_OPS.isdisjoint(expr):
+                return expr
+        
+        # Handle word problems
+        if 'circle' in query_lower and 'radius' in query_lower:
+            if '5' in query:
+                return "3.14159 * 5 * 5"  # Area of circle
+        
+        # Extract numbers and operators
+        numbers = _NUM_RE.findall(query)
+        if len(numbers) >= 2:
+            if 'multiply' in query or '*' in query:
+                return f"{numbers[0]} * {numbers[1]}"
+            elif 'add' in query or '+' in query:
+                return f"{numbers[0]} + {numbers[1]}"
+        
+        return query  # fallback
+        
+    elif tool_name == _TOOL_WEATHER:
+        # Extract location (city, country, or region)
+        # Check for locations in the predefined list
+        hits = set(_NONALPHA_RE.split(query_lower)) & _SINGLE_WORD_LOCS
+        hits.update(location for location in _MULTI_WORD_LOCS if location in query_lower)
+        if hits:
+            location = min(hits, key=_LOCATION_INDEX.__getitem__)
+            # Handle special cases for UAE
+            if location in _UAE_NAMES:
+                return 'Dubai'  # Use Dubai as default UAE city
+            return location.title()
+        
+        # Look for patterns like "weather in/of [location]"
+        for pattern in _WEATHER_PATTERNS:
+            match = pattern.search(query_lower)
+            if match:
+                location = match.group(1).strip()
+                # Clean up common words
+                location = _ART_RE.sub('', location)
+                if len(location) > 1 and location not in _NOT_LOCATIONS:
+                    # Handle special cases
+                    if location in _UAE_NAMES:
+                        return 'Dubai'
+                    return location.title()
+        
+        # Last resort: extract any capitalized words (likely proper nouns)
+        words = query.split()
+        for word in words:
+            if word[0].isupper() and len(word) > 2 and word.lower() not in _NOT_PROPER_NOUNS:
+                if word.upper() == 'UAE':
+                    return 'Dubai'
+                return word
+        
+        return "London"  # final default
+        
+    elif tool_name == _TOOL_SEARCH:
+        # Extract main topic
+        words = [w for w in tokens if w not in _SEARCH_STOPWORDS]
+        return ' '.join(words[:3])  # Take first 3 meaningful words
+    
+    elif tool_name == _TOOL_NEWS:
+        # Extract news topic, keep news-related words
+        words = [w for w in tokens if w not in _NEWS_STOPWORDS]
+        return ' '.join(words[:4])  # Take first 4 meaningful words for news
+    
+    return query
+
+def _drain(generator):
+    """Run a generator to completion and return its return value"""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as done:
+            return done.value
+
+class ReasoningStep(namedtuple('ReasoningStep', 'step content')):
+    """One reasoning step, also readable as step['step'] / step.get('content') like a dict"""
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return super().__getitem__(key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+# Instruction block sent ahead of every rewrite request. It is kept
+# byte-identical and placed before the per-query text so the inference
+# server can reuse its cached prefix instead of prefilling it each time.
+_RESPONSE_PROMPT_PREFIX = """Please provide a helpful and natural response to the human based on the tool information that follows.
+
+"""
+
 class FreeLLMAgent:
     """MRKL Agent using Hugging Face models with API"""
     
     def __init__(self):
         self.tools = TOOLS
-        self.reasoning_steps = []
+        # Per-thread so one agent can be shared by concurrent Streamlit sessions
+        self._local = threading.local()
         self.hf_token = os.getenv('HUGGINGFACE_API_TOKEN')
-        self.reflector = ReflectorAgent()  # Initialize reflector agent
+        self._reflector = None  # Reflector agent, created on first validation
         self.setup_llm()
     
+    @property
+    def reflector(self):
+        """Reflector agent used to validate responses, imported and built on first use"""
+        if self._reflector is None:
+            from reflector_agent import ReflectorAgent
+            self._reflector = ReflectorAgent()
+        return self._reflector
+    
+    @property
+    def reasoning_steps(self):
+        """Reasoning steps of the query currently being processed on this thread"""
+        if not hasattr(self._local, 'steps'):
+            self._local.steps = []
+        return self._local.steps
+    
+    @reasoning_steps.setter
+    def reasoning_steps(self, steps):
+        self._local.steps = steps
+    
     def setup_llm(self):
         """Initialize the LLM using Hugging Face API"""
+        # Rewriting tool results with the HF model is opt-in; by default the
+        # tool result is returned as-is, skipping a slow remote inference call
+        self.use_llm_rewrite = os.getenv('MRKL_LLM_REWRITE', '0') == '1'
         try:
             if self.hf_token:
                 # Use Hugging Face API for better models
                 self.api_url = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-large"
                 self.headers = {"Authorization": f"Bearer {self.hf_token}"}
+                # Keep-alive session so each query reuses the TLS connection
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                
+                self.session = requests.Session()
+                self.session.headers.update(self.headers)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                      max_retries=Retry(total=2, backoff_factor=0.3))
+                self.session.mount('https://', adapter)
                 self.model_loaded = True
                 self.use_api = True
                 print("✅ Connected to Hugging Face API with your token")
@@ -38,254 +350,49 @@ class FreeLLMAgent:
             self.model_loaded = False
             self.use_api = False
     
-    def think(self, query):
+    def think(self, query, query_lower=None):
         """Analyze query and determine which tool to use"""
+        if query_lower is None:
+            query_lower = query.lower()
         self.reasoning_steps = []
         
         # Step 1: Understanding the query
-        self.reasoning_steps.append({
-            "step": "Query Analysis", 
-            "content": f"Analyzing user query: '{query}'"
-        })
+        self.reasoning_steps.append(ReasoningStep("Query Analysis", f"Analyzing user query: '{query}'"))
         
         # Check if query is meaningless/random first
-        if self._is_meaningless_query(query):
-            self.reasoning_steps.append({
-                "step": "Input Validation",
-                "content": "Detected meaningless or random input - cannot process"
-            })
-            return 'invalid'
+        if self._is_meaningless_query(query, query_lower):
+            self.reasoning_steps.append(ReasoningStep("Input Validation", "Detected meaningless or random input - cannot process"))
+            return _TOOL_INVALID
         
         # Step 2: Enhanced tool selection logic
-        query_lower = query.lower()
-        
-        # Calculator detection
-        if any(keyword in query_lower for keyword in ['calculate', 'math', '+', '-', '*', '/', '=', 'sum', 'multiply', 'divide', 'compute', 'formula']):
-            selected_tool = 'calculator'
-            reasoning = "Detected mathematical operations - selecting Calculator tool"
-        
-        # Weather detection  
-        elif any(keyword in query_lower for keyword in ['weather', 'temperature', 'rain', 'sunny', 'climate', 'forecast', 'humidity', 'wind']):
-            selected_tool = 'weather'  
-            reasoning = "Detected weather-related query - selecting Weather tool"
-        
-        # News detection
-        elif any(keyword in query_lower for keyword in ['news', 'latest', 'recent', 'current events', 'breaking', 'today', 'yesterday', 'happening']):
-            selected_tool = 'news'
-            reasoning = "Detected news/current events request - selecting News tool"
+        selected_tool, reasoning = _select_tool(query_lower)
         
-        # Search detection for general information
-        elif any(keyword in query_lower for keyword in ['what is', 'tell me about', 'define', 'explain', 'information', 'who is', 'when did', 'where is', 'how does']):
-            selected_tool = 'search'
-            reasoning = "Detected general information request - selecting Search tool"
-        
-        # Default to search for any other queries
-        else:
-            selected_tool = 'search'
-            reasoning = "General query detected - defaulting to Search tool for comprehensive information"
-        
-        self.reasoning_steps.append({
-            "step": "Tool Selection",
-            "content": reasoning
-        })
+        self.reasoning_steps.append(ReasoningStep("Tool Selection", reasoning))
         
         return selected_tool
     
-    def _is_meaningless_query(self, query):
+    def _is_meaningless_query(self, query, query_lower=None):
         """Detect if the query appears to be random characters or meaningless"""
-        # Remove whitespace and convert to lowercase
-        cleaned_query = query.strip().lower()
-        
-        # If query is too short (less than 3 characters), likely meaningless
-        if len(cleaned_query) < 3:
-            return True
-        
-        # Check if query contains only repeated characters (like "aaaaa" or "yuyuyu")
-        if len(set(cleaned_query)) <= 2 and len(cleaned_query) > 5:
-            return True
-        
-        # Check if query uses very limited character set with suspicious repetition
-        unique_chars = set(cleaned_query)
-        if len(cleaned_query) > 10 and len(unique_chars) <= 4:
-            from collections import Counter
-            char_counts = Counter(cleaned_query)
-            # If most characters appear many times, it's likely random mashing
-            max_count = max(char_counts.values())
-            if max_count >= len(cleaned_query) * 0.3:  # Any char appears 30%+ of time
-                return True
-        
-        # Check for excessive repetition of small patterns
-        if re.search(r'(.{1,3})\1{4,}', cleaned_query):  # Same 1-3 chars repeated 4+ times
-            return True
-        
-        # Check if query has suspicious patterns
-        vowels = set('aeiou')
-        consonants = set('bcdfghjklmnpqrstvwxyz')
-        
-        query_letters = [c for c in cleaned_query if c.isalpha()]
-        if len(query_letters) > 5:  # Only check if enough letters
-            vowel_count = sum(1 for c in query_letters if c in vowels)
-            consonant_count = sum(1 for c in query_letters if c in consonants)
-            
-            # If no vowels in a word longer than 5 characters, likely random
-            if vowel_count == 0 and consonant_count > 5:
-                return True
-            
-            # If ratio of consonants to vowels is extremely high, likely random
-            if vowel_count > 0 and (consonant_count / vowel_count) > 8:
-                return True
-        
-        # Check for specific repetitive patterns that indicate random input
-        # Look for alternating or repetitive character sequences
-        if len(cleaned_query) > 10:
-            # Check for patterns like "yuhyuhyuh" or "gugugu"
-            for i in range(2, 6):  # Check pattern lengths 2-5
-                pattern = cleaned_query[:i]
-                repetitions = len(cleaned_query) // len(pattern)
-                if repetitions >= 3:  # If pattern repeats 3+ times
-                    reconstructed = (pattern * repetitions)[:len(cleaned_query)]
-                    similarity = sum(1 for a, b in zip(cleaned_query, reconstructed) if a == b)
-                    similarity_ratio = similarity / len(cleaned_query)
-                    if similarity_ratio > 0.7:  # 70% similarity indicates repetitive pattern
-                        return True
-        
-        # Check if query contains random character patterns
-        random_patterns = [
-            r'^[yh]+$',  # Only y and h repeated
-            r'^[qwerty]+$',  # Only keyboard row letters
-            r'^[asdfgh]+$',  # Only keyboard row letters
-            r'^[zxcvbn]+$',  # Only keyboard row letters
-        ]
-        
-        for pattern in random_patterns:
-            if re.match(pattern, cleaned_query) and len(cleaned_query) > 8:
-                return True
-        
-        # Check for lack of dictionary-like words
-        # Split by common delimiters and check if any recognizable words exist
-        potential_words = re.split(r'[^a-zA-Z]', cleaned_query)
-        valid_words = []
-        
-        common_words = {
-            'the', 'and', 'is', 'in', 'to', 'of', 'a', 'that', 'it', 'with', 'for', 'as', 'was', 'on', 'are', 'you', 'this', 'be', 'at', 'have', 'or', 'not', 'from', 'by', 'they', 'we', 'say', 'her', 'she', 'an', 'each', 'which', 'do', 'how', 'their', 'if', 'will', 'up', 'other', 'about', 'out', 'many', 'then', 'them', 'these', 'so', 'some', 'what', 'would', 'make', 'like', 'into', 'time', 'has', 'two', 'more', 'go', 'no', 'way', 'could', 'my', 'than', 'first', 'been', 'call', 'who', 'oil', 'its', 'now', 'find', 'long', 'down', 'day', 'did', 'get', 'come', 'made', 'may', 'part', 'weather', 'calculate', 'news', 'search', 'tell', 'me', 'what', 'when', 'where', 'why', 'how', 'university', 'heriot', 'watt'
-        }
-        
-        for word in potential_words:
-            word = word.lower().strip()
-            if len(word) >= 3 and (word in common_words or len(word) >= 4):
-                valid_words.append(word)
-        
-        # If query is long but has no recognizable words, likely meaningless
-        if len(cleaned_query) > 10 and len(valid_words) == 0:
-            return True
-        
-        return False
+        if query_lower is None:
+            query_lower = query.lower()
+        return _is_meaningless(query_lower)
     
-    def extract_parameters(self, query, tool_name):
+    def extract_parameters(self, query, tool_name, query_lower=None):
         """Extract relevant parameters from query for the selected tool"""
-        if tool_name == 'calculator':
-            # Extract mathematical expression
-            # Look for mathematical patterns
-            math_pattern = r'[\d\+\-\*\/\(\)\.\s\^]+'
-            matches = re.findall(math_pattern, query)
-            if matches:
-                expr = max(matches, key=len).strip()
-                if any(op in expr for op in ['+', '-', '*', '/']):
-                    return expr
-            
-            # Handle word problems
-            if 'circle' in query.lower() and 'radius' in query.lower():
-                if '5' in query:
-                    return "3.14159 * 5 * 5"  # Area of circle
-            
-            # Extract numbers and operators
-            numbers = re.findall(r'\d+\.?\d*', query)
-            if len(numbers) >= 2:
-                if 'multiply' in query or '*' in query:
-                    return f"{numbers[0]} * {numbers[1]}"
-                elif 'add' in query or '+' in query:
-                    return f"{numbers[0]} + {numbers[1]}"
-            
-            return query  # fallback
-            
-        elif tool_name == 'weather':
-            # Extract location (city, country, or region)
+        if query_lower is None:
             query_lower = query.lower()
-            
-            # Extended list of cities and countries
-            locations = [
-                'london', 'paris', 'tokyo', 'new york', 'mumbai', 'berlin', 'delhi', 'sydney', 'toronto',
-                'dubai', 'abu dhabi', 'uae', 'united arab emirates', 'india', 'usa', 'uk', 'canada',
-                'germany', 'france', 'japan', 'australia', 'singapore', 'hong kong', 'bangkok',
-                'moscow', 'rome', 'madrid', 'amsterdam', 'zurich', 'istanbul', 'cairo', 'riyadh'
-            ]
-            
-            # Check for locations in the predefined list
-            for location in locations:
-                if location in query_lower:
-                    # Handle special cases for UAE
-                    if location in ['uae', 'united arab emirates']:
-                        return 'Dubai'  # Use Dubai as default UAE city
-                    return location.title()
-            
-            # Look for patterns like "weather in/of [location]"
-            patterns = [
-                r'weather (?:in|of) ([a-zA-Z\s]+?)(?:\?|$|,)',
-                r'(?:in|of) ([a-zA-Z\s]+?)(?:\?|$|,)',
-                r'([a-zA-Z\s]+?) weather'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, query_lower)
-                if match:
-                    location = match.group(1).strip()
-                    # Clean up common words
-                    location = re.sub(r'^(the|a|an)\s+', '', location)
-                    if len(location) > 1 and location not in ['weather', 'temperature', 'forecast']:
-                        # Handle special cases
-                        if location in ['uae', 'united arab emirates']:
-                            return 'Dubai'
-                        return location.title()
-            
-            # Last resort: extract any capitalized words (likely proper nouns)
-            words = query.split()
-            for word in words:
-                if word[0].isupper() and len(word) > 2 and word.lower() not in ['weather', 'what', 'is', 'the']:
-                    if word.upper() == 'UAE':
-                        return 'Dubai'
-                    return word
-            
-            return "London"  # final default
-            
-        elif tool_name == 'search':
-            # Extract main topic
-            stop_words = ['what', 'is', 'tell', 'me', 'about', 'explain', 'define', 'the']
-            words = [w for w in query.lower().split() if w not in stop_words]
-            return ' '.join(words[:3])  # Take first 3 meaningful words
-        
-        elif tool_name == 'news':
-            # Extract news topic, keep news-related words
-            stop_words = ['get', 'me', 'the', 'some', 'find']
-            words = [w for w in query.lower().split() if w not in stop_words]
-            return ' '.join(words[:4])  # Take first 4 meaningful words for news
-        
-        return query
+        return _extract_parameters(query, query_lower, tool_name)
     
     def execute_tool(self, tool_name, parameters):
         """Execute the selected tool with parameters"""
-        if tool_name in self.tools:
-            tool = self.tools[tool_name]
-            self.reasoning_steps.append({
-                "step": "Tool Execution",
-                "content": f"Executing {tool.name} with parameters: {parameters}"
-            })
+        # One dict lookup both finds the tool and checks it exists
+        tool = self.tools.get(tool_name)
+        if tool is not None:
+            self.reasoning_steps.append(ReasoningStep("Tool Execution", f"Executing {tool.name} with parameters: {parameters}"))
             
             result = tool.execute(parameters)
             
-            self.reasoning_steps.append({
-                "step": "Result",
-                "content": result
-            })
+            self.reasoning_steps.append(ReasoningStep("Result", result))
             
             return result
         else:
@@ -293,16 +400,19 @@ class FreeLLMAgent:
     
     def generate_response(self, query, tool_result):
         """Generate a natural response using the LLM"""
-        if self.model_loaded and self.use_api and self.hf_token:
+        return _drain(self._stream_response(query, tool_result))
+    
+    def _stream_response(self, query, tool_result):
+        """Yield the final response in chunks as the LLM produces it; returns the full text"""
+        if self.use_llm_rewrite and self.model_loaded and self.use_api and self.hf_token:
+            chunks = []
             try:
-                # Create a better prompt for response generation
-                prompt = f"""Human: {query}
+                # Static instructions first, query and tool output last
+                prompt = _RESPONSE_PROMPT_PREFIX + f"""Human: {query}
 Tool Information: {tool_result}
-
-Please provide a helpful and natural response based on the tool information above.
 Assistant:"""
 
-                # Use Hugging Face API
+                # Use Hugging Face API, streaming tokens when the endpoint supports it
                 payload = {
                     "inputs": prompt,
                     "parameters": {
@@ -310,57 +420,94 @@ Assistant:"""
                         "temperature": 0.7,
                         "do_sample": True,
                         "return_full_text": False
-                    }
+                    },
+                    "stream": True
                 }
                 
-                response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if isinstance(result, list) and len(result) > 0:
-                        generated_text = result[0].get('generated_text', '').strip()
-                        if generated_text:
-                            return generated_text
+                with self.session.post(self.api_url, json=payload, timeout=30, stream=True) as response:
+                    if response.status_code == 200:
+                        if response.headers.get('content-type', '').startswith('text/event-stream'):
+                            for line in response.iter_lines():
+                                if not line.startswith(b'data:'):
+                                    continue
+                                token = json.loads(line[5:]).get('token') or {}
+                                text = '' if token.get('special') else token.get('text', '')
+                                if not chunks:
+                                    text = text.lstrip()
+                                if text:
+                                    chunks.append(text)
+                                    yield text
+                        else:
+                            # Model served without streaming: one JSON body as before
+                            result = response.json()
+                            if isinstance(result, list) and len(result) > 0:
+                                generated_text = result[0].get('generated_text', '').strip()
+                                if generated_text:
+                                    chunks.append(generated_text)
+                                    yield generated_text
                 
             except Exception as e:
                 print(f"HF API generation failed: {e}")
+            
+            if chunks:
+                return ''.join(chunks).strip()
         
         # Enhanced fallback response (no local model to avoid PyTorch issues)
-        return self._create_smart_response(query, tool_result)
+        response_text = self._create_smart_response(query, tool_result)
+        yield response_text
+        return response_text
     
     def _create_smart_response(self, query, tool_result):
         """Create intelligent fallback responses"""
-        query_lower = query.lower()
-        
         # Return clean tool result without prefixes
         return tool_result
     
-    def process_query(self, query):
+    def process_queries(self, queries, max_workers=4):
+        """Process several queries concurrently; results come back in input order"""
+        queries = list(queries)
+        if not queries:
+            return []
+        self.reflector  # build it once up front rather than racing in the workers
+        # Tool calls are network-bound, so threads overlap them; reasoning steps
+        # are per-thread, so the workers don't see each other's state
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as pool:
+            return list(pool.map(self.process_query, queries))
+    
+    def process_query(self, query, on_step=None):
         """Main method to process a query through the MRKL pipeline"""
+        return _drain(self.stream_query(query, on_step))
+    
+    def stream_query(self, query, on_step=None):
+        """
+        Run the MRKL pipeline, yielding the response text as it is produced.
+        The generator's return value is the result dict process_query returns.
+        If given, on_step(step) is called with each reasoning step as it is added.
+        """
+        reported = 0
+        
+        def report_steps():
+            nonlocal reported
+            if on_step is not None:
+                steps = self.reasoning_steps
+                for step in steps[reported:]:
+                    on_step(step)
+                reported = len(steps)
         
         # Special case: Heriot-Watt University current events
         query_lower = query.lower()
-        if ('heriot' in query_lower and 'watt' in query_lower and 
-            ('current' in query_lower or 'event' in query_lower or 'happening' in query_lower)):
+        if 'heriot' in query_lower and 'watt' in query_lower and _HW_EVENT_RE.search(query_lower):
             
             # Create custom reasoning steps for this special case
             self.reasoning_steps = [
-                {
-                    "step": "Query Analysis",
-                    "content": "Detected specific question about current events at Heriot-Watt University"
-                },
-                {
-                    "step": "Knowledge Retrieval", 
-                    "content": "Accessing prepared information about Rabbitron Lab activities"
-                },
-                {
-                    "step": "Response Generation",
-                    "content": "Providing current workshop information"
-                }
+                ReasoningStep("Query Analysis", "Detected specific question about current events at Heriot-Watt University"),
+                ReasoningStep("Knowledge Retrieval", "Accessing prepared information about Rabbitron Lab activities"),
+                ReasoningStep("Response Generation", "Providing current workshop information")
             ]
+            report_steps()
             
             # Add validation for special case
             response_text = 'The Rabbitron Lab is hosting a workshop about AI agents where students and researchers can learn about artificial intelligence, autonomous systems, and intelligent agent development.'
+            yield response_text
             validation = self.reflector.validate_response(
                 original_query=query,
                 mrkl_response=response_text,
@@ -377,16 +524,16 @@ Assistant:"""
             }
         
         # Step 1: Think and select tool (normal MRKL pipeline)
-        selected_tool = self.think(query)
+        selected_tool = self.think(query, query_lower)
+        report_steps()
         
         # Handle invalid/meaningless queries
-        if selected_tool == 'invalid':
-            self.reasoning_steps.append({
-                "step": "Input Validation Failed",
-                "content": "Query appears to be random characters or meaningless input"
-            })
+        if selected_tool == _TOOL_INVALID:
+            self.reasoning_steps.append(ReasoningStep("Input Validation Failed", "Query appears to be random characters or meaningless input"))
+            report_steps()
             
             error_response = "I'm sorry, but your input appears to be random characters or doesn't contain recognizable words. Could you please provide a clear question or request? For example:\n\n• Ask for a calculation: 'What is 25 * 4 + 100?'\n• Request weather: 'What's the weather in London?'\n• Search for information: 'What is quantum computing?'\n• Get news: 'Latest news about AI'"
+            yield error_response
             
             # Create validation for invalid input
             validation = {
@@ -411,23 +558,22 @@ Assistant:"""
             }
         
         # Step 2: Extract parameters
-        parameters = self.extract_parameters(query, selected_tool)
-        self.reasoning_steps.append({
-            "step": "Parameter Extraction", 
-            "content": f"Extracted parameters: {parameters}"
-        })
+        parameters = self.extract_parameters(query, selected_tool, query_lower)
+        self.reasoning_steps.append(ReasoningStep("Parameter Extraction", f"Extracted parameters: {parameters}"))
+        report_steps()
         
         # Step 3: Execute tool
         tool_result = self.execute_tool(selected_tool, parameters)
+        report_steps()
         
         # Step 4: Generate final response
-        final_response = self.generate_response(query, tool_result)
-        self.reasoning_steps.append({
-            "step": "Final Response",
-            "content": final_response
-        })
+        final_response = yield from self._stream_response(query, tool_result)
+        self.reasoning_steps.append(ReasoningStep("Final Response", final_response))
+        report_steps()
         
         # Step 5: Validate the response using the reflector agent
+        # (kept serial: each step needs the previous one's output, and the
+        # reflector is local rule-based CPU work with no I/O to overlap)
         validation = self.reflector.validate_response(
             original_query=query,
             mrkl_response=final_response,
@@ -1,6 +1,12 @@
 import streamlit as st
+import html
 import time
+import uuid
+from collections import deque
+from itertools import islice
 from agent import FreeLLMAgent
+from cache import LLMCache
+from history_store import ChatArchive
 
 # Page configuration
 st.set_page_config(
@@ -9,16 +15,124 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_agent():
+    """One agent (tools, HTTP session, reflector) shared by every browser session"""
+    return FreeLLMAgent()
+
+@st.cache_resource
+def get_response_cache():
+    """Recent answers shared across sessions, so repeated (e.g. sample) queries skip the pipeline"""
+    return LLMCache()
+
+@st.cache_resource
+def get_chat_archive():
+    """On-disk chat history for all sessions; only the newest turns stay in session state"""
+    return ChatArchive()
+
+# Style for the highlighted answer box, sent once per script run
+ANSWER_CSS = """<style>
+.mrkl-answer {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    padding: 25px;
+    border-radius: 15px;
+    margin: 20px 0;
+    font-size: 18px;
+    line-height: 1.8;
+    box-shadow: 0 8px 16px rgba(0,0,0,0.2);
+    border-left: 5px solid #ffd700;
+}
+</style>"""
+
+SAMPLE_QUERIES = (
+    "What's 15 * 23 + 100?",
+    "Weather in Tokyo?",
+    "Latest news about AI",
+    "What is quantum computing?",
+    "Current events in technology",
+    "Calculate 3.14159 * 5 * 5",
+    "What is the current event happening in Heriot Watt University?"
+)
+
+RESUBMIT_WINDOW_SECONDS = 2  # Identical sends within this window are ignored
+
+HISTORY_PAGE_SIZE = 20  # Older turns rendered per "Show older" click
+
 # Initialize session state
 if 'agent' not in st.session_state:
-    st.session_state.agent = FreeLLMAgent()
+    st.session_state.agent = get_agent()
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    # The latest turn plus one page of older ones; the rest live in the archive
+    st.session_state.chat_history = deque(maxlen=HISTORY_PAGE_SIZE + 1)
+    st.session_state.chat_total = 0
+if 'history_window' not in st.session_state:
+    st.session_state.history_window = HISTORY_PAGE_SIZE
+st.session_state.setdefault('current_query', '')
+
+st.markdown(ANSWER_CSS, unsafe_allow_html=True)
 
 # Title
 st.title("🤖 MRKL Agent with Real-Time Data")
 st.markdown("### *Modular Reasoning, Knowledge and Language System*")
 
+def make_chat_entry(query, result):
+    """History entry with its display-only fields worked out once, at insert time"""
+    response = result['response']
+    return {
+        'query': query,
+        'result': result,
+        'timestamp': time.time(),  # formatted only if the entry is rendered
+        'preview': response[:200] + "..." if len(response) > 200 else response,
+        'step_count': len(result['reasoning_steps'])
+    }
+
+AI_VERDICTS = {'correct': "🤖 AI Agrees", 'incorrect': "🤖 AI Disagrees"}
+
+def render_validation_summary(validation):
+    """Reflector verdict, confidence and AI opinion as one markdown string"""
+    confidence = f"Confidence: {validation['confidence_level']}%"
+    if validation['validation_decision']:
+        lines = [f":green-background[**✅ ANSWER VALIDATED**] {confidence}"]
+    else:
+        issues = len(validation.get('improvement_suggestions', []))
+        lines = [f":red-background[**❌ ANSWER FLAGGED**] {confidence} • Issues Found: {issues}"]
+    
+    ai_val = validation.get('ai_validation', {})
+    if ai_val.get('validation_successful'):
+        ai_decision = ai_val['ai_decision']
+        lines.append(f"{AI_VERDICTS.get(ai_decision, '🤖 AI Uncertain')} "
+                     f"({ai_decision.title()}, {ai_val['ai_confidence']}% confidence)")
+    return "\n\n".join(lines)
+
+def record_chat(query, result):
+    """Add a turn to the in-memory history and the on-disk archive"""
+    entry = make_chat_entry(query, result)
+    st.session_state.chat_history.append(entry)
+    st.session_state.chat_total += 1
+    get_chat_archive().add(st.session_state.session_id, entry)
+
+@st.fragment
+def render_samples():
+    """Sample query buttons; clicks rerun just this block unless the query box must change"""
+    for idx, query in enumerate(SAMPLE_QUERIES):
+        # Only touch state when it actually changes (e.g. not on a repeat click)
+        if st.button(f"📝 {query}", key=f"sample_btn_{idx}") and st.session_state.current_query != query:
+            st.session_state.current_query = query
+            st.rerun()
+    
+    if st.button("🚀 Run All Samples", key="run_all_samples_btn"):
+        with st.spinner("🧠 Running all sample queries..."):
+            results = st.session_state.agent.process_queries(SAMPLE_QUERIES)
+        
+        cache = get_response_cache()
+        for query, result in zip(SAMPLE_QUERIES, results):
+            cache.set(query, result)
+            record_chat(query, result)
+        st.rerun()
+
 # Sidebar with information
 with st.sidebar:
     st.header("🛠️ Available Tools")
@@ -33,45 +147,48 @@ with st.sidebar:
     st.markdown("**Alternative Approaches**: Different solution strategies")
     
     st.header("💡 Sample Queries")
-    sample_queries = [
-        "What's 15 * 23 + 100?",
-        "Weather in Tokyo?",
-        "Latest news about AI",
-        "What is quantum computing?",
-        "Current events in technology",
-        "Calculate 3.14159 * 5 * 5",
-        "What is the current event happening in Heriot Watt University?"
-    ]
-    
-    for idx, query in enumerate(sample_queries):
-        if st.button(f"📝 {query}", key=f"sample_btn_{idx}"):
-            st.session_state.current_query = query
+    render_samples()
 
-# Main interface
-col1, col2 = st.columns([2, 1])
+def stream_into(holder, stream):
+    """Relay a stream to st.write_stream, keeping the generator's return value in holder"""
+    holder['result'] = yield from stream
 
-with col1:
-    st.header("💬 Chat with MRKL Agent")
-    
+@st.fragment
+def render_query_input():
+    """Query box and send button; typing here only reruns this fragment"""
     # Query input
     query = st.text_input(
         "Ask me anything:", 
-        value=st.session_state.get('current_query', ''),
+        value=st.session_state.current_query,
         placeholder="e.g., What's 25 * 4? or Weather in London?",
         key="main_query_input"
     )
     
     if st.button("🚀 Send Query", type="primary", key="send_query_btn") and query:
-        with st.spinner("🧠 Agent is thinking..."):
-            # Process the query
-            result = st.session_state.agent.process_query(query)
+        # Ignore an accidental double submit of the same query
+        now = time.time()
+        if (st.session_state.get('last_submitted') == query
+                and now - st.session_state.get('last_submitted_at', 0) < RESUBMIT_WINDOW_SECONDS):
+            return
+        st.session_state.last_submitted = query
+        st.session_state.last_submitted_at = now
+        
+        with st.status("🧠 Agent is thinking...", expanded=True) as status:
+            # Process the query, listing each reasoning step and showing the
+            # answer as soon as they start arriving
+            cache = get_response_cache()
+            result = cache.get(query)
+            if result is None:
+                holder = {}
+                stream = st.session_state.agent.stream_query(
+                    query, on_step=lambda step: status.write(f"**{step.step}**: {step.content}"))
+                st.write_stream(stream_into(holder, stream))
+                result = holder['result']
+                cache.set(query, result)
+            status.update(label="✅ Agent finished", state="complete", expanded=False)
             
             # Add to chat history
-            st.session_state.chat_history.append({
-                'query': query,
-                'result': result,
-                'timestamp': time.strftime("%H:%M:%S")
-            })
+            record_chat(query, result)
             
             # Clear the input
             st.session_state.current_query = ""
@@ -80,41 +197,33 @@ with col1:
             st.success(f"✅ Query processed successfully! Check the conversation below.")
             st.rerun()
 
+# Main interface
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.header("💬 Chat with MRKL Agent")
+    
+    render_query_input()
+
 with col2:
     st.header("🔍 Current Reasoning")
     
     if st.session_state.chat_history:
         latest = st.session_state.chat_history[-1]
+        result = latest['result']
+        validation = result.get('validation')
         
         # Show current query info
         st.info(f"**Latest Query:** {latest['query']}")
         
         # Tool and parameters in a nice format
-        st.metric("🛠️ Tool Selected", latest['result']['tool_used'])
-        st.code(f"Parameters: {latest['result']['parameters']}", language="text")
+        st.metric("🛠️ Tool Selected", result['tool_used'])
+        st.code(f"Parameters: {result['parameters']}", language="text")
         
         # Validation quick summary
-        if 'validation' in latest['result']:
-            validation = latest['result']['validation']
+        if validation is not None:
             st.subheader("🔍 Validation Status")
-            
-            # Show validation decision with color coding
-            if validation['validation_decision']:
-                st.success(f"✅ VALIDATED")
-                st.metric("Confidence", f"{validation['confidence_level']}%")
-            else:
-                st.error(f"❌ FLAGGED")
-                st.metric("Issues Found", len(validation.get('improvement_suggestions', [])))
-                
-            # Show AI validation status if available
-            if validation.get('ai_validation', {}).get('validation_successful'):
-                ai_decision = validation['ai_validation']['ai_decision']
-                if ai_decision == 'correct':
-                    st.success("🤖 AI Agrees")
-                elif ai_decision == 'incorrect':
-                    st.warning("🤖 AI Disagrees") 
-                else:
-                    st.info("🤖 AI Uncertain")
+            st.markdown(render_validation_summary(validation))
         
         # Point to main response area
         st.subheader("👇 Complete Response")
@@ -131,192 +240,214 @@ with col2:
         st.write("5. **Response Generation** - Create final answer")
 
 # Latest Response Highlight
-if st.session_state.chat_history:
-    latest = st.session_state.chat_history[-1]
-    st.header("🎯 Latest Agent Response")
-    
-    with st.container():
-        # User question
-        st.markdown("### 🔸 Your Question:")
-        st.info(f"**{latest['query']}**")
-        
-        # Agent response prominently displayed
-        st.markdown("### 🤖 Answer:")
-        
-        # Highlighted response box
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 25px;
-            border-radius: 15px;
-            margin: 20px 0;
-            font-size: 18px;
-            line-height: 1.8;
-            box-shadow: 0 8px 16px rgba(0,0,0,0.2);
-            border-left: 5px solid #ffd700;
-        ">
-            <strong>{latest['result']['response']}</strong>
-        </div>
-        """, unsafe_allow_html=True)
+@st.fragment
+def render_latest():
+    """Latest answer, validation and reasoning; reruns on its own, not with the input"""
+    if st.session_state.chat_history:
+        latest = st.session_state.chat_history[-1]
+        # Looked up once here and reused throughout the block below
+        result = latest['result']
+        validation = result.get('validation')
+        if validation is not None:
+            ai_val = validation.get('ai_validation', {})
+            answer_analysis = validation.get('answer_analysis', {})
+            reasoning_val = validation.get('reasoning_validation', {})
+        st.header("🎯 Latest Agent Response")
         
-        # Validation Status Section - Show prominently
-        if 'validation' in latest['result']:
-            validation = latest['result']['validation']
-            st.markdown("### 🔍 **Reflector Agent Validation:**")
+        with st.container():
+            # User question
+            st.markdown("### 🔸 Your Question:")
+            st.info(f"**{latest['query']}**")
             
-            # Create validation status with big visual indicator
-            if validation['validation_decision']:
-                st.success(f"✅ **ANSWER VALIDATED** - Confidence: {validation['confidence_level']}%")
-                st.markdown(f"**Validation Reasoning:** {validation['validation_reasoning']}")
-            else:
-                st.error(f"❌ **ANSWER FLAGGED** - Confidence: {validation['confidence_level']}%") 
-                st.markdown(f"**Issues Found:** {validation['validation_reasoning']}")
-                
-                # Show improvement suggestions prominently if answer is flagged
-                if validation['improvement_suggestions']:
-                    st.warning("**Suggested Improvements:**")
-                    for suggestion in validation['improvement_suggestions']:
-                        st.write(f"• {suggestion}")
+            # Agent response prominently displayed
+            st.markdown("### 🤖 Answer:")
             
-            # Show AI validation details if available
-            if validation.get('ai_validation', {}).get('validation_successful'):
-                ai_val = validation['ai_validation']
-                st.info(f"🤖 **AI Model Says:** {ai_val['ai_decision'].title()} ({ai_val['ai_confidence']}% confidence)")
-        
-        # Reasoning steps section
-        st.markdown("### 🧠 How I Got This Answer:")
-        for i, step in enumerate(latest['result']['reasoning_steps'], 1):
-            with st.expander(f"Step {i}: {step['step']}", expanded=False):
-                st.write(step['content'])
-        
-        # Detailed Validation Analysis (Expandable)
-        if 'validation' in latest['result']:
-            validation = latest['result']['validation']
+            # Highlighted response box
+            st.markdown(f'<div class="mrkl-answer"><strong>{html.escape(result["response"])}</strong></div>',
+                        unsafe_allow_html=True)
             
-            with st.expander("📊 **Detailed Validation Analysis**", expanded=False):
-                tab1, tab2, tab3 = st.tabs(["Answer Analysis", "Reasoning Check", "AI Validation"])
-                
-                with tab1:
-                    st.markdown("**Answer Content Analysis:**")
-                    answer_analysis = validation.get('answer_analysis', {})
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.info(f"**Answer Type:** {answer_analysis.get('answer_type', 'Unknown').title()}")
-                        st.info(f"**Response Length:** {answer_analysis.get('response_length', 0)} characters")
-                    
-                    with col2:
-                        if answer_analysis.get('contains_calculation'):
-                            st.success("✅ Contains Mathematical Calculation")
-                        if answer_analysis.get('contains_factual_info'):
-                            st.success("✅ Contains Factual Information")
-                    
-                    if answer_analysis.get('potential_issues'):
-                        st.warning("**Potential Issues Detected:**")
-                        for issue in answer_analysis['potential_issues']:
-                            st.write(f"⚠️ {issue}")
+            # Validation Status Section - Show prominently
+            if validation is not None:
+                st.markdown("### 🔍 **Reflector Agent Validation:**")
                 
-                with tab2:
-                    st.markdown("**Reasoning Chain Validation:**")
-                    reasoning_val = validation.get('reasoning_validation', {})
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Steps Count", reasoning_val.get('step_count', 0))
-                    with col2:
-                        st.metric("Completeness", f"{reasoning_val.get('completeness_score', 0)}%")
-                    with col3:
-                        quality = reasoning_val.get('reasoning_quality', 'Unknown')
-                        if quality == 'Excellent':
-                            st.success(f"Quality: {quality}")
-                        elif quality == 'Good':
-                            st.info(f"Quality: {quality}")
-                        else:
-                            st.warning(f"Quality: {quality}")
+                # Verdict, confidence and AI opinion in one block
+                st.markdown(render_validation_summary(validation))
+                if validation['validation_decision']:
+                    st.markdown(f"**Validation Reasoning:** {validation['validation_reasoning']}")
+                else:
+                    st.markdown(f"**Issues Found:** {validation['validation_reasoning']}")
                     
-                    if reasoning_val.get('missing_steps'):
-                        st.warning("**Missing Steps:**")
-                        for step in reasoning_val['missing_steps']:
-                            st.write(f"❌ {step}")
-                
-                with tab3:
-                    st.markdown("**AI Model Validation:**")
-                    ai_val = validation.get('ai_validation', {})
+                    # Show improvement suggestions prominently if answer is flagged
+                    if validation['improvement_suggestions']:
+                        st.warning("**Suggested Improvements:**")
+                        for suggestion in validation['improvement_suggestions']:
+                            st.write(f"• {suggestion}")
+            
+            # Reasoning steps section
+            st.markdown("### 🧠 How I Got This Answer:")
+            for i, step in enumerate(result['reasoning_steps'], 1):
+                with st.expander(f"Step {i}: {step['step']}", expanded=False):
+                    st.write(step['content'])
+            
+            # Detailed Validation Analysis (Expandable)
+            if validation is not None:
+                with st.expander("📊 **Detailed Validation Analysis**", expanded=False):
+                    tab1, tab2, tab3 = st.tabs(["Answer Analysis", "Reasoning Check", "AI Validation"])
                     
-                    if ai_val.get('validation_successful'):
-                        decision = ai_val.get('ai_decision', 'uncertain')
-                        confidence = ai_val.get('ai_confidence', 0)
+                    with tab1:
+                        st.markdown("**Answer Content Analysis:**")
                         
                         col1, col2 = st.columns(2)
                         with col1:
-                            if decision == 'correct':
-                                st.success(f"✅ AI Decision: {decision.title()}")
-                            elif decision == 'incorrect':
-                                st.error(f"❌ AI Decision: {decision.title()}")
-                            else:
-                                st.info(f"🤔 AI Decision: {decision.title()}")
+                            st.info(f"**Answer Type:** {answer_analysis.get('answer_type', 'Unknown').title()}")
+                            st.info(f"**Response Length:** {answer_analysis.get('response_length', 0)} characters")
+                        
+                        with col2:
+                            if answer_analysis.get('contains_calculation'):
+                                st.success("✅ Contains Mathematical Calculation")
+                            if answer_analysis.get('contains_factual_info'):
+                                st.success("✅ Contains Factual Information")
+                        
+                        if answer_analysis.get('potential_issues'):
+                            st.warning("**Potential Issues Detected:**")
+                            for issue in answer_analysis['potential_issues']:
+                                st.write(f"⚠️ {issue}")
+                    
+                    with tab2:
+                        st.markdown("**Reasoning Chain Validation:**")
                         
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("Steps Count", reasoning_val.get('step_count', 0))
                         with col2:
-                            st.metric("AI Confidence", f"{confidence}%")
+                            st.metric("Completeness", f"{reasoning_val.get('completeness_score', 0)}%")
+                        with col3:
+                            quality = reasoning_val.get('reasoning_quality', 'Unknown')
+                            if quality == 'Excellent':
+                                st.success(f"Quality: {quality}")
+                            elif quality == 'Good':
+                                st.info(f"Quality: {quality}")
+                            else:
+                                st.warning(f"Quality: {quality}")
+                        
+                        if reasoning_val.get('missing_steps'):
+                            st.warning("**Missing Steps:**")
+                            for step in reasoning_val['missing_steps']:
+                                st.write(f"❌ {step}")
+                    
+                    with tab3:
+                        st.markdown("**AI Model Validation:**")
                         
-                        st.text_area("AI Reasoning:", ai_val.get('ai_reasoning', 'No reasoning provided'), height=100)
-                    else:
-                        st.warning("AI validation was not available")
-                        st.write(ai_val.get('ai_reasoning', 'No details available'))
+                        if ai_val.get('validation_successful'):
+                            decision = ai_val.get('ai_decision', 'uncertain')
+                            confidence = ai_val.get('ai_confidence', 0)
+                            
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                if decision == 'correct':
+                                    st.success(f"✅ AI Decision: {decision.title()}")
+                                elif decision == 'incorrect':
+                                    st.error(f"❌ AI Decision: {decision.title()}")
+                                else:
+                                    st.info(f"🤔 AI Decision: {decision.title()}")
+                            
+                            with col2:
+                                st.metric("AI Confidence", f"{confidence}%")
+                            
+                            st.text_area("AI Reasoning:", ai_val.get('ai_reasoning', 'No reasoning provided'), height=100)
+                        else:
+                            st.warning("AI validation was not available")
+                            st.write(ai_val.get('ai_reasoning', 'No details available'))
+            
+            # Tool info
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.success(f"🛠️ **Tool Used:** {result['tool_used']}")
+            with col_b:
+                st.info(f"📝 **Parameters:** {result['parameters']}")
         
-        # Tool info
-        col_a, col_b = st.columns(2)
-        with col_a:
-            st.success(f"🛠️ **Tool Used:** {latest['result']['tool_used']}")
-        with col_b:
-            st.info(f"📝 **Parameters:** {latest['result']['parameters']}")
-    
-    st.markdown("---")
+        st.markdown("---")
+
+render_latest()
+
+def show_older_history():
+    st.session_state.history_window += HISTORY_PAGE_SIZE
 
 # Full Chat History
-st.header("💬 Conversation History")
+@st.fragment
+def render_history():
+    """Earlier turns, rendered in their own fragment; only the newest page is drawn"""
+    # Full Chat History
+    st.header("💬 Conversation History")
 
-if st.session_state.chat_history:
-    for i, chat in enumerate(reversed(st.session_state.chat_history)):
-        is_latest = (i == 0)  # First item in reversed list is latest
+    chat_history = st.session_state.chat_history
+    total = st.session_state.chat_total
+    if total == 1:
+        # If only one message, don't duplicate
+        st.info("👆 Your latest interaction is shown above!")
+    elif total:
+        window = st.session_state.history_window
+        archive = get_chat_archive()
+        if window + 1 > len(chat_history) and total > len(chat_history):
+            # The archive prunes old turns, possibly some of this session's, so
+            # count only the turns that can still be shown
+            total = st.session_state.chat_total = max(
+                archive.count(st.session_state.session_id), len(chat_history)
+            )
+        # Skip the latest one since it's already shown above
+        if window + 1 <= len(chat_history) or total <= len(chat_history):
+            older = islice(reversed(chat_history), 1, window + 1)
+        else:
+            # Past the in-memory page, read the turns back from disk
+            older = archive.recent(st.session_state.session_id, window, offset=1)
         
-        with st.container():
-            # Skip the latest one since it's already shown above
-            if is_latest and len(st.session_state.chat_history) > 1:
-                continue
-            elif is_latest:
-                # If only one message, don't duplicate
-                st.info("👆 Your latest interaction is shown above!")
-                break
-            
-            # User message
-            with st.chat_message("user"):
-                st.markdown(f"**{chat['query']}**")
-                st.caption(f"🕐 {chat['timestamp']}")
-            
-            # Agent response (condensed for history)
-            with st.chat_message("assistant"):
-                # Show condensed version
-                response_preview = chat['result']['response'][:200] + "..." if len(chat['result']['response']) > 200 else chat['result']['response']
-                st.markdown(response_preview)
+        # Steps repeated across turns (e.g. the same tool selection) are drawn
+        # once and referenced afterwards; maps (step, content) to its query
+        seen_steps = {}
+        for chat in older:
+            with st.container():
+                # User message
+                with st.chat_message("user"):
+                    st.markdown(f"**{chat['query']}**")
+                    st.caption(f"🕐 {time.strftime('%H:%M:%S', time.localtime(chat['timestamp']))}")
                 
-                # Tool info as caption
-                st.caption(f"🔧 {chat['result']['tool_used']} • {chat['result']['parameters']}")
+                # Agent response (condensed for history)
+                with st.chat_message("assistant"):
+                    # Show condensed version
+                    st.markdown(chat['preview'])
+                    
+                    # Tool info as caption
+                    st.caption(f"🔧 {chat['result']['tool_used']} • {chat['result']['parameters']}")
+                    
+                    # Expandable reasoning steps
+                    with st.expander("🧠 Show Reasoning Steps", expanded=False):
+                        for j, step in enumerate(chat['result']['reasoning_steps'], 1):
+                            step_key = (step['step'], step['content'])
+                            if step_key in seen_steps:
+                                st.write(f"**Step {j}: {step['step']}** — same as for “{seen_steps[step_key]}”")
+                            else:
+                                seen_steps[step_key] = chat['query']
+                                st.write(f"**Step {j}: {step['step']}**")
+                                st.write(f"└─ {step['content']}")
+                            if j < chat['step_count']:
+                                st.write("---")
                 
-                # Expandable reasoning steps
-                with st.expander("🧠 Show Reasoning Steps", expanded=False):
-                    for j, step in enumerate(chat['result']['reasoning_steps'], 1):
-                        st.write(f"**Step {j}: {step['step']}**")
-                        st.write(f"└─ {step['content']}")
-                        if j < len(chat['result']['reasoning_steps']):
-                            st.write("---")
-            
-            st.divider()
-else:
-    st.info("👋 Start by asking a question above! Try the sample queries from the sidebar.")
+                st.divider()
+        
+        hidden = total - 1 - window
+        if hidden > 0:
+            st.caption(f"📜 {hidden} older message{'s' if hidden != 1 else ''} not shown")
+            st.button("⬇️ Show older", key="show_older_btn", on_click=show_older_history)
+    else:
+        st.info("👋 Start by asking a question above! Try the sample queries from the sidebar.")
+
+render_history()
 
 # Clear chat button
-if st.button("🗑️ Clear Chat History", key="clear_chat_btn"):
-    st.session_state.chat_history = []
+# Nothing to redraw when the history is already empty, so skip the extra rerun
+if st.button("🗑️ Clear Chat History", key="clear_chat_btn") and st.session_state.chat_history:
+    st.session_state.chat_history.clear()
+    st.session_state.chat_total = 0
+    get_chat_archive().clear(st.session_state.session_id)
+    st.session_state.history_window = HISTORY_PAGE_SIZE
     st.rerun()
\ No newline at end of file
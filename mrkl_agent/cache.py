@@ -0,0 +1,69 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class LLMCache:
+    """
+    Cache of process_query results (and slow tool lookups) keyed by the
+    normalized query text.
+    Entries expire after a TTL so live data (weather, news) stays fresh,
+    and the least recently used entry is evicted once the cache is full.
+    """
+    
+    def __init__(self, max_entries=256, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(query):
+        """Case, spacing and trailing punctuation don't change the answer"""
+        normalized = ' '.join(query.lower().split()).rstrip('?!. ')
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    
+    def get(self, query):
+        """Return the cached result for query, or None on a miss"""
+        key = self._key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, result = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def set(self, query, result):
+        """Store result for query, evicting the oldest entries if full"""
+        key = self._key(query)
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get_or_compute(self, query, compute):
+        """Return the cached result, or call compute(query) and cache it"""
+        result = self.get(query)
+        if result is None:
+            result = compute(query)
+            self.set(query, result)
+        return result
+    
+    def hit_rate(self):
+        """Fraction of get() calls answered from the cache so far"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
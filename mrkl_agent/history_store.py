@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from agent import ReasoningStep
+
+def _default_path():
+    """The archive file in a per-user data directory that only its owner can open"""
+    directory = os.path.join(os.path.expanduser('~'), '.cache', 'mrkl_agent')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, 'chat_history.sqlite3')
+
+class ChatArchive:
+    """
+    On-disk copy of every chat turn, one SQLite table shared by all sessions.
+    The app keeps only the newest turns in memory and pages older ones in
+    from here, so a long conversation doesn't grow the session state.
+    Abandoned sessions are never cleared by a user, so turns older than the
+    TTL, and all but the newest max_entries, are pruned on write.
+    The file lives at path, else $MRKL_CHAT_ARCHIVE, else under ~/.cache/mrkl_agent.
+    """
+
+    def __init__(self, path=None, ttl_seconds=7 * 24 * 60 * 60, max_entries=10000):
+        self.path = path or os.getenv('MRKL_CHAT_ARCHIVE') or _default_path()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Chats are private: a new file is created readable by its owner only
+        os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+        # Streamlit reruns may land on different threads; the lock serializes access
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT NOT NULL, entry_json TEXT NOT NULL, "
+                "created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chat_session ON chat (session, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chat_created ON chat (created)")
+            self._prune()
+
+    def add(self, session, entry):
+        """Append one chat entry for session"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO chat (session, entry_json, created) VALUES (?, ?, ?)",
+                               (session, json.dumps(entry, default=str), time.time()))
+            self._prune()
+
+    def count(self, session):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chat WHERE session = ?", (session,)).fetchone()[0]
+
+    def recent(self, session, limit, offset=0):
+        """Up to limit entries for session, newest first, skipping the newest offset"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry_json FROM chat WHERE session = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (session, limit, offset)
+            ).fetchall()
+        return [self._load(entry_json) for (entry_json,) in rows]
+
+    def clear(self, session):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat WHERE session = ?", (session,))
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM chat WHERE created <= ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM chat WHERE id NOT IN (SELECT id FROM chat ORDER BY id DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    @staticmethod
+    def _load(entry_json):
+        entry = json.loads(entry_json)
+        # Reasoning steps come back from JSON as [step, content] pairs
+        entry['result']['reasoning_steps'] = [ReasoningStep(*step) for step in entry['result']['reasoning_steps']]
+        return entry
@@ -1,8 +1,19 @@
 from agent import FreeLLMAgent
+from cache import LLMCache
+from functools import lru_cache
+import atexit
+import os
 import time
 
-def demo_scenarios():
-    """Run predefined demo scenarios"""
+HISTORY_FILE = os.path.expanduser('~/.mrkl_history')
+
+@lru_cache(maxsize=1)
+def get_agent():
+    """Create the agent once and reuse it for demos and interactive turns"""
+    return FreeLLMAgent()
+
+def demo_scenarios(pace=False):
+    """Run predefined demo scenarios; pace=True pauses between them for presenting"""
     scenarios = [
         "What's 15 * 23 + 100?",
         "What's the weather like in Tokyo?", 
@@ -10,21 +21,21 @@ def demo_scenarios():
         "Calculate the area of a circle with radius 5"
     ]
     
-    agent = FreeLLMAgent()
+    agent = get_agent()
     
     print("🤖 MRKL Agent Demo (Command Line Version)")
     print("=" * 60)
     print("This demo shows a MRKL agent using FREE LLM + modular tools")
     print("For interactive web demo, run: streamlit run app.py")
     print("=" * 60)
+    print("🧠 Agent is thinking...")
+    
+    # Process all scenarios at once so their tool calls overlap
+    results = agent.process_queries(scenarios)
     
-    for i, query in enumerate(scenarios, 1):
+    for i, (query, result) in enumerate(zip(scenarios, results), 1):
         print(f"\n📝 Demo Scenario {i}")
         print(f"Student Question: {query}")
-        print("🧠 Agent is thinking...")
-        
-        # Process query
-        result = agent.process_query(query)
         
         # Show reasoning process
         print("\n🔍 Reasoning Steps:")
@@ -34,15 +45,31 @@ def demo_scenarios():
         print(f"\n✅ Final Response: {result['response']}")
         print("-" * 60)
         
-        if i < len(scenarios):
+        if pace and i < len(scenarios):
             time.sleep(1)  # Pause between demos
 
+def setup_line_editing():
+    """Give input() arrow-key editing and a history kept across sessions, where readline exists"""
+    try:
+        import readline
+    except ImportError:  # e.g. Windows
+        return
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass
+    readline.set_history_length(1000)
+    atexit.register(readline.write_history_file, HISTORY_FILE)
+
 def interactive_mode():
     """Interactive chat mode"""
-    agent = FreeLLMAgent()
+    agent = get_agent()
+    cache = LLMCache()
+    show_details = False
+    setup_line_editing()
     
     print("\n🤖 MRKL Agent - Interactive Mode")
-    print("Type 'quit' to exit, 'demo' for predefined scenarios")
+    print("Type 'quit' to exit, 'demo' for predefined scenarios, 'steps' to toggle reasoning steps")
     print("=" * 50)
     
     while True:
@@ -54,19 +81,22 @@ def interactive_mode():
         elif query.lower() == 'demo':
             demo_scenarios()
             continue
+        elif query.lower() == 'steps':
+            show_details = not show_details
+            print(f"🔍 Reasoning steps {'on' if show_details else 'off'}")
+            continue
         elif not query:
             continue
         
         print("🧠 Processing...")
-        result = agent.process_query(query)
+        result = cache.get_or_compute(query, agent.process_query)
         
         print(f"\n🔧 Tool: {result['tool_used']}")
         print(f"📊 Parameters: {result['parameters']}")
         print(f"✅ Response: {result['response']}")
         
-        # Option to see detailed reasoning
-        show_details = input("Show reasoning steps? (y/n): ").strip().lower()
-        if show_details == 'y':
+        # Detailed reasoning, if toggled on
+        if show_details:
             print("\n🔍 Detailed Reasoning:")
             for i, step in enumerate(result['reasoning_steps'], 1):
                 print(f"  {i}. {step['step']}: {step['content']}")
@@ -77,7 +107,8 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == 'interactive':
         interactive_mode()
     else:
-        demo_scenarios()
+        demo_scenarios(pace='--pace' in sys.argv)
         
         print("\n🌐 For web interface: streamlit run app.py")
         print("🔄 For interactive mode: python main.py interactive")
+        print("⏱️ To pause between demo scenarios: python main.py --pace")
@@ -1,9 +1,264 @@
 import os
-import requests
 import json
 import re
+import ast
+import operator
+import copy
+import hashlib
+import logging
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque, namedtuple
+from functools import lru_cache
+from itertools import islice
 from datetime import datetime
 
+# Per-validation tracing; silent unless the caller turns on DEBUG logging
+_LOG = logging.getLogger(__name__)
+
+# Patterns used on every validation, compiled once at import time
+_DIGITS_RE = re.compile(r'\d+')
+_DIGIT_RE = re.compile(r'\d')
+_MATH_OP_RE = re.compile(r'[+\-*/^]')
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+# Look for patterns like "15 * 23 + 100" or "calculate 5+3"
+_MATH_EXPR_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(\d+(?:\.\d+)?\s*[+\-*/^]\s*\d+(?:\.\d+)?(?:\s*[+\-*/^]\s*\d+(?:\.\d+)?)*)',
+    r'calculate\s+([0-9+\-*/.^() ]+)',
+    r'what[\'s]*\s+([0-9+\-*/.^() ]+)\?*',
+    r'([0-9+\-*/.^() ]+)\s*=',
+)]
+# Operator spellings rewritten to Python's in one translate() pass each
+_QUERY_MATH_TRANS = str.maketrans({'×': '*', '÷': '/'})
+_EXPR_MATH_TRANS = str.maketrans({'^': '**', 'x': '*', 'X': '*'})
+_ALLOWED_EXPR_CHARS = frozenset('0123456789+-*/(). ')
+# Look for patterns like "= 445", "result: 445", "answer is 445"
+_RESULT_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'=\s*(\d+(?:\.\d+)?)',
+    r'result[:\s]+(\d+(?:\.\d+)?)',
+    r'answer[:\s]+(\d+(?:\.\d+)?)',
+    r'(\d+(?:\.\d+)?)$',  # Number at end of string
+    r':\s*(\d+(?:\.\d+)?)',  # Number after colon
+)]
+
+# Query keywords that decide how an answer is judged. One lookahead scan reports
+# every keyword occurring anywhere in the query (none is a prefix of another),
+# which is the same as testing `keyword in query` for each of them.
+_QUERY_KEYWORDS = ('calculate', 'math', '+', '-', '*', '/', '=', 'weather', 'temperature', 'climate',
+                   'what', 'who', 'where', 'when', 'why', 'how', 'explain', 'define')
+_QUERY_KEYWORD_RE = re.compile('(?=(' + '|'.join(map(re.escape, _QUERY_KEYWORDS)) + '))')
+_MATH_KEYWORDS = frozenset({'calculate', 'math', '+', '-', '*', '/'})
+_WEATHER_KEYWORDS = frozenset({'weather', 'temperature'})
+_QUESTION_WORDS = frozenset({'what', 'who', 'where', 'when', 'why', 'how'})
+# Words showing a response carries weather information. Matched as substrings
+# ("rainy" counts for "rain"), via one regex scan rather than one scan per word.
+_WEATHER_RESPONSE_WORDS = ('temperature', 'degrees', 'weather', 'sunny', 'cloudy', 'rain')
+_WEATHER_RESPONSE_RE = re.compile('|'.join(_WEATHER_RESPONSE_WORDS))
+_WEATHER_DETAIL_RE = re.compile('|'.join(_WEATHER_RESPONSE_WORDS + ('celsius', 'fahrenheit')))
+_TOOL_NAME_RE = re.compile('calculator|weather|search|news')
+
+def _query_keywords(query):
+    """Set of _QUERY_KEYWORDS found in the lowercased query"""
+    return frozenset(match.group(1) for match in _QUERY_KEYWORD_RE.finditer(query.lower()))
+
+# What the answer checks need to know about one (query, response) pair,
+# worked out once per validation instead of once per check
+_ValidationInput = namedtuple('_ValidationInput', 'query response response_lower response_length query_keywords')
+
+def _validation_input(query, response):
+    return _ValidationInput(query, response, response.lower(), len(response), _query_keywords(query))
+
+@lru_cache(maxsize=256)
+def _extract_math_expression(query):
+    """Extract mathematical expression from query"""
+    
+    query_clean = query.translate(_QUERY_MATH_TRANS)
+    
+    for pattern in _MATH_EXPR_PATTERNS:
+        match = pattern.search(query_clean)
+        if match:
+            expr = match.group(1).strip()
+            # Basic validation - should contain numbers and operators
+            if _DIGIT_RE.search(expr) and _MATH_OP_RE.search(expr):
+                return expr
+    
+    return None
+
+@lru_cache(maxsize=256)
+def _extract_result(response):
+    """Extract numerical result from response"""
+    
+    for pattern in _RESULT_PATTERNS:
+        match = pattern.search(response)
+        if match:
+            try:
+                return float(match.group(1)) if '.' in match.group(1) else int(match.group(1))
+            except ValueError:
+                continue
+    
+    # If no pattern matches, look for any number in the response
+    numbers = _NUMBER_RE.findall(response)
+    if numbers:
+        try:
+            return float(numbers[-1]) if '.' in numbers[-1] else int(numbers[-1])
+        except ValueError:
+            pass
+    
+    return None
+
+# The math check only needs to verify everyday arithmetic, so powers are capped before
+# they are computed; an expression like 9**9**9 would otherwise stall the validation
+_MAX_EXPONENT = 1000
+_MAX_POWER_BITS = 100_000
+
+def _bounded_pow(base, exponent):
+    if abs(exponent) > _MAX_EXPONENT:
+        raise ValueError(f"Exponent {exponent} is too large (limit {_MAX_EXPONENT})")
+    if isinstance(base, int) and isinstance(exponent, int) and base.bit_length() * exponent > _MAX_POWER_BITS:
+        raise ValueError("Result of the power is too large")
+    return operator.pow(base, exponent)
+
+# Arithmetic the math check may evaluate; anything else in an expression is rejected
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: _bounded_pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+@lru_cache(maxsize=256)
+def _safe_eval(expression):
+    """Evaluate a plain arithmetic expression by walking its AST instead of calling eval()"""
+    # eval() ignores leading blanks, the parser doesn't
+    return _eval_node(ast.parse(expression.lstrip(' \t'), mode='eval').body)
+
+def _eval_node(node):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        return _BINARY_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise TypeError(f"Unsupported expression element: {type(node).__name__}")
+
+@lru_cache(maxsize=256)
+def _validate_math(query, response):
+    """Actually validate mathematical calculations for correctness"""
+    
+    validation_result = {
+        'is_correct': False,
+        'expected_result': None,
+        'provided_result': None,
+        'expression': None
+    }
+    
+    try:
+        # Extract mathematical expression from query
+        expression = _extract_math_expression(query)
+        if not expression:
+            return validation_result
+        
+        validation_result['expression'] = expression
+        
+        # Calculate expected result safely
+        try:
+            # Replace common math symbols
+            safe_expr = expression.translate(_EXPR_MATH_TRANS)
+            # Only allow safe mathematical operations
+            if _ALLOWED_EXPR_CHARS.issuperset(safe_expr):
+                expected_result = _safe_eval(safe_expr)
+                validation_result['expected_result'] = expected_result
+                
+                # Extract provided result from response
+                provided_result = _extract_result(response)
+                validation_result['provided_result'] = provided_result
+                
+                # Compare results (with some tolerance for floating point)
+                if provided_result is not None:
+                    if isinstance(expected_result, float) or isinstance(provided_result, float):
+                        # Allow small floating point differences
+                        validation_result['is_correct'] = abs(expected_result - provided_result) < 0.01
+                    else:
+                        validation_result['is_correct'] = expected_result == provided_result
+                        
+        except (SyntaxError, ValueError, ZeroDivisionError):
+            # If we can't evaluate, assume it might be correct
+            validation_result['is_correct'] = True  # Be lenient if we can't verify
+            
+    except Exception:
+        # If anything goes wrong, be lenient
+        validation_result['is_correct'] = True
+        
+    return validation_result
+
+# Completeness score thresholds and the reasoning quality each one reaches
+_QUALITY_THRESHOLDS = (40, 60, 80)
+_QUALITY_LABELS = ('Poor', 'Acceptable', 'Good', 'Excellent')
+
+@lru_cache(maxsize=256)
+def _check_reasoning_chain(outline):
+    """Reasoning-chain checks for a tuple of (step name, content is very short) pairs"""
+    
+    validation = {
+        'step_count': len(outline),
+        'logical_consistency': True,
+        'completeness_score': 0,
+        'step_issues': [],
+        'missing_steps': [],
+        'reasoning_quality': 'Good'
+    }
+    
+    actual_steps = [step_name for step_name, _ in outline]
+    
+    # Check for missing critical steps (be more lenient)
+    critical_steps = ['Query Analysis', 'Tool Selection', 'Tool Execution']  # Reduced to truly critical steps
+    for critical_step in critical_steps:
+        if not any(critical_step.lower() in actual_step.lower() for actual_step in actual_steps):
+            validation['missing_steps'].append(critical_step)
+    
+    # Validate individual steps (be more forgiving)
+    for i, (step_name, is_minimal) in enumerate(outline):
+        # Only flag very short steps
+        if is_minimal:
+            validation['step_issues'].append(f"Step {i+1} ({step_name}): Very minimal content")
+        
+        # Skip connection checking as it was too strict
+    
+    # Calculate completeness score (more generous)
+    if len(critical_steps) > 0:
+        completion_ratio = (len(critical_steps) - len(validation['missing_steps'])) / len(critical_steps)
+    else:
+        completion_ratio = 1.0
+        
+    # Boost score if we have any reasonable number of steps
+    if len(actual_steps) >= 3:
+        completion_ratio = max(completion_ratio, 0.8)  # At least 80% if we have 3+ steps
+    
+    validation['completeness_score'] = int(completion_ratio * 100)
+    
+    # Determine overall reasoning quality (more lenient)
+    quality = _QUALITY_LABELS[bisect_right(_QUALITY_THRESHOLDS, validation['completeness_score'])]
+    if quality == 'Excellent' and validation['step_issues']:
+        quality = 'Good'  # Excellent also needs every step to have real content
+    validation['reasoning_quality'] = quality
+    validation['logical_consistency'] = quality != 'Poor'
+    
+    return validation
+
+# Outcome of _make_validation_decision; only validate_response reads it
+_Decision = namedtuple('_Decision', 'is_correct confidence reasoning suggestions')
+
+def _timestamp():
+    """Report timestamp, "YYYY-MM-DD HH:MM:SS" in local time"""
+    return datetime.now().isoformat(sep=' ', timespec='seconds')
+
+_VALIDATION_CACHE_SIZE = 256  # Recent reports kept for identical (query, response, steps)
+_VALIDATION_HISTORY_SIZE = 1000  # Reports kept for get_validation_summary()
+
 class ReflectorAgent:
     """
     Enhanced Reflector Agent that validates MRKL agent responses.
@@ -13,11 +268,12 @@ class ReflectorAgent:
     
     def __init__(self):
         self.hf_token = os.getenv('HUGGINGFACE_API_TOKEN')
-        self.validation_history = []
-        
-        # Hugging Face API setup for validation
-        self.validation_api_url = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-        self.headers = {"Authorization": f"Bearer {self.hf_token}"}
+        self.validation_history = deque(maxlen=_VALIDATION_HISTORY_SIZE)
+        # Running totals over validation_history, so the summary needn't rescan it
+        self._correct_count = 0
+        self._confidence_sum = 0
+        self._validation_cache = OrderedDict()  # input digest -> validation report
+        self._lock = threading.Lock()  # guards the cache, history and totals
         
         print("🔍 Reflector Agent initialized with validation capabilities")
         
@@ -34,61 +290,142 @@ class ReflectorAgent:
             Dictionary containing validation results and reasoning
         """
         
-        print(f"🔍 Reflector validating response: {mrkl_response[:50]}...")
+        _LOG.debug("🔍 Reflector validating response: %.50s...", mrkl_response)
+        
+        # A blank answer is wrong whatever the query was; skip the content checks
+        if not mrkl_response.strip():
+            validation_report = self._quick_report(original_query, mrkl_response, reasoning_steps, "Response is empty")
+            self._record(validation_report)
+            return validation_report
+        
+        # The checks are deterministic, so an identical input gets the stored report
+        cache_key = self._validation_key(original_query, mrkl_response, reasoning_steps)
+        with self._lock:
+            cached = self._validation_cache.get(cache_key)
+            if cached is not None:
+                self._validation_cache.move_to_end(cache_key)
+        if cached is not None:
+            validation_report = copy.deepcopy(cached)
+            validation_report['timestamp'] = _timestamp()
+            self._record(validation_report)
+            return validation_report
+        
+        # Lowercase, measure and scan the inputs once; every step below reuses them
+        validation_input = _validation_input(original_query, mrkl_response)
         
         # Step 1: Analyze the answer type and content
-        answer_analysis = self._analyze_answer_content(original_query, mrkl_response)
+        answer_analysis = self._analyze_answer_content(validation_input)
         
         # Step 2: Validate reasoning chain
-        reasoning_validation = self._validate_reasoning_chain(reasoning_steps, original_query)
+        reasoning_validation = self._validate_reasoning_chain(reasoning_steps, original_query, validation_input.query_keywords)
         
         # Step 3: Use AI model for intelligent validation
-        ai_validation = self._ai_powered_validation(original_query, mrkl_response, reasoning_steps)
+        ai_validation = self._ai_powered_validation(validation_input, reasoning_steps)
         
         # Step 4: Make final validation decision
         final_decision = self._make_validation_decision(answer_analysis, reasoning_validation, ai_validation)
         
         # Create comprehensive validation report
         validation_report = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'timestamp': _timestamp(),
             'original_query': original_query,
             'mrkl_response': mrkl_response,
-            'validation_decision': final_decision['is_correct'],
-            'confidence_level': final_decision['confidence'],
-            'validation_reasoning': final_decision['reasoning'],
+            'validation_decision': final_decision.is_correct,
+            'confidence_level': final_decision.confidence,
+            'validation_reasoning': final_decision.reasoning,
             'answer_analysis': answer_analysis,
             'reasoning_validation': reasoning_validation,
             'ai_validation': ai_validation,
-            'improvement_suggestions': final_decision.get('suggestions', []),
-            'validation_status': 'CORRECT' if final_decision['is_correct'] else 'INCORRECT'
+            'improvement_suggestions': final_decision.suggestions,
+            'validation_status': 'CORRECT' if final_decision.is_correct else 'INCORRECT'
         }
         
         # Store validation in history
-        self.validation_history.append(validation_report)
+        self._record(validation_report)
+        with self._lock:
+            self._validation_cache[cache_key] = copy.deepcopy(validation_report)
+            while len(self._validation_cache) > _VALIDATION_CACHE_SIZE:
+                self._validation_cache.popitem(last=False)
         
         return validation_report
     
-    def _analyze_answer_content(self, query, response):
+    def _quick_report(self, original_query, mrkl_response, reasoning_steps, issue):
+        """INCORRECT report for an answer rejected before the content checks, same shape as a full one"""
+        return {
+            'timestamp': _timestamp(),
+            'original_query': original_query,
+            'mrkl_response': mrkl_response,
+            'validation_decision': False,
+            'confidence_level': 0,
+            'validation_reasoning': f"❌ ANSWER FLAGGED: {issue}",
+            'answer_analysis': {
+                'answer_type': self._determine_query_type(original_query),
+                'contains_calculation': False,
+                'contains_factual_info': False,
+                'response_length': len(mrkl_response),
+                'specific_patterns': [],
+                'potential_issues': [issue],
+                'math_validation': None
+            },
+            'reasoning_validation': self._validate_reasoning_chain(reasoning_steps, original_query),
+            'ai_validation': {
+                'ai_confidence': 0,
+                'ai_decision': 'incorrect',
+                'ai_reasoning': f"Issues identified: {issue}",
+                'model_used': 'Rule-Based Validator',
+                'validation_successful': True
+            },
+            'improvement_suggestions': [issue],
+            'validation_status': 'INCORRECT'
+        }
+    
+    def validate_batch(self, items, max_workers=8):
+        """Validate (query, response, reasoning_steps) triples concurrently; reports come back in input order"""
+        items = list(items)
+        if not items:
+            return []
+        # Each validation is independent; the cache, history and totals are
+        # shared, and validate_response already takes the lock around them
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+            return list(pool.map(lambda item: self.validate_response(*item), items))
+    
+    def _record(self, validation_report):
+        """Append a report to the bounded history and keep the running totals in step"""
+        with self._lock:
+            if len(self.validation_history) == self.validation_history.maxlen:
+                evicted = self.validation_history[0]
+                self._correct_count -= bool(evicted['validation_decision'])
+                self._confidence_sum -= evicted['confidence_level']
+            self.validation_history.append(validation_report)
+            self._correct_count += bool(validation_report['validation_decision'])
+            self._confidence_sum += validation_report['confidence_level']
+    
+    @staticmethod
+    def _validation_key(original_query, mrkl_response, reasoning_steps):
+        """Digest of everything the validation result depends on"""
+        steps_json = json.dumps(reasoning_steps, sort_keys=True, default=str)
+        payload = '\x00'.join((original_query, mrkl_response, steps_json))
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+    
+    def _analyze_answer_content(self, validation_input):
         """Analyze the content and structure of the MRKL agent's answer"""
+        query, response, response_lower, response_length, query_keywords = validation_input
         
         analysis = {
             'answer_type': 'unknown',
             'contains_calculation': False,
             'contains_factual_info': False,
-            'response_length': len(response),
+            'response_length': response_length,
             'specific_patterns': [],
             'potential_issues': [],
             'math_validation': None
         }
         
-        query_lower = query.lower()
-        response_lower = response.lower()
-        
         # Determine answer type
-        if any(word in query_lower for word in ['calculate', 'math', '+', '-', '*', '/', '=']):
+        if query_keywords & _MATH_KEYWORDS or '=' in query_keywords:
             analysis['answer_type'] = 'mathematical'
             # Check if response contains numerical answer
-            if re.search(r'\d+', response):
+            if _DIGITS_RE.search(response):
                 analysis['contains_calculation'] = True
                 
                 # Actually validate the mathematical calculation
@@ -105,223 +442,76 @@ class ReflectorAgent:
             else:
                 analysis['potential_issues'].append("Mathematical query but no numerical answer found")
                 
-        elif any(word in query_lower for word in ['weather', 'temperature', 'climate']):
+        elif query_keywords & _WEATHER_KEYWORDS or 'climate' in query_keywords:
             analysis['answer_type'] = 'weather'
-            if any(word in response_lower for word in ['temperature', 'degrees', 'weather', 'sunny', 'cloudy', 'rain']):
+            if _WEATHER_RESPONSE_RE.search(response_lower):
                 analysis['contains_factual_info'] = True
                 analysis['specific_patterns'].append("Contains weather-related information")
             else:
                 analysis['potential_issues'].append("Weather query but no weather information in response")
                 
-        elif any(word in query_lower for word in ['what', 'who', 'where', 'when', 'why', 'how']):
+        elif query_keywords & _QUESTION_WORDS:
             analysis['answer_type'] = 'informational'
-            if len(response) > 30:
+            if response_length > 30:
                 analysis['contains_factual_info'] = True
             else:
                 analysis['potential_issues'].append("Informational query but response seems too brief")
                 
         # Check response completeness
-        if len(response) < 10:
+        if response_length < 10:
             analysis['potential_issues'].append("Response appears too short")
-        elif len(response) > 500:
+        elif response_length > 500:
             analysis['potential_issues'].append("Response might be unnecessarily long")
             
         return analysis
     
     def _validate_mathematical_answer(self, query, response):
         """Actually validate mathematical calculations for correctness"""
-        
-        validation_result = {
-            'is_correct': False,
-            'expected_result': None,
-            'provided_result': None,
-            'expression': None
-        }
-        
-        try:
-            # Extract mathematical expression from query
-            expression = self._extract_math_expression(query)
-            if not expression:
-                return validation_result
-            
-            validation_result['expression'] = expression
-            
-            # Calculate expected result safely
-            try:
-                # Replace common math symbols
-                safe_expr = expression.replace('^', '**').replace('x', '*').replace('X', '*')
-                # Only allow safe mathematical operations
-                allowed_chars = '0123456789+-*/(). '
-                if all(c in allowed_chars for c in safe_expr):
-                    expected_result = eval(safe_expr)
-                    validation_result['expected_result'] = expected_result
-                    
-                    # Extract provided result from response
-                    provided_result = self._extract_result_from_response(response)
-                    validation_result['provided_result'] = provided_result
-                    
-                    # Compare results (with some tolerance for floating point)
-                    if provided_result is not None:
-                        if isinstance(expected_result, float) or isinstance(provided_result, float):
-                            # Allow small floating point differences
-                            validation_result['is_correct'] = abs(expected_result - provided_result) < 0.01
-                        else:
-                            validation_result['is_correct'] = expected_result == provided_result
-                            
-            except (SyntaxError, ValueError, ZeroDivisionError):
-                # If we can't evaluate, assume it might be correct
-                validation_result['is_correct'] = True  # Be lenient if we can't verify
-                
-        except Exception:
-            # If anything goes wrong, be lenient
-            validation_result['is_correct'] = True
-            
-        return validation_result
+        # Copy, so callers can't alter the memoised result
+        return dict(_validate_math(query, response))
     
     def _extract_math_expression(self, query):
         """Extract mathematical expression from query"""
-        
-        # Look for patterns like "15 * 23 + 100" or "calculate 5+3"
-        patterns = [
-            r'(\d+(?:\.\d+)?\s*[+\-*/^]\s*\d+(?:\.\d+)?(?:\s*[+\-*/^]\s*\d+(?:\.\d+)?)*)',
-            r'calculate\s+([0-9+\-*/.^() ]+)',
-            r'what[\'s]*\s+([0-9+\-*/.^() ]+)\?*',
-            r'([0-9+\-*/.^() ]+)\s*=',
-        ]
-        
-        query_clean = query.replace('×', '*').replace('÷', '/')
-        
-        for pattern in patterns:
-            match = re.search(pattern, query_clean, re.IGNORECASE)
-            if match:
-                expr = match.group(1).strip()
-                # Basic validation - should contain numbers and operators
-                if re.search(r'\d', expr) and re.search(r'[+\-*/^]', expr):
-                    return expr
-        
-        return None
+        return _extract_math_expression(query)
     
     def _extract_result_from_response(self, response):
         """Extract numerical result from response"""
-        
-        # Look for patterns like "= 445", "result: 445", "answer is 445"
-        patterns = [
-            r'=\s*(\d+(?:\.\d+)?)',
-            r'result[:\s]+(\d+(?:\.\d+)?)',
-            r'answer[:\s]+(\d+(?:\.\d+)?)',
-            r'(\d+(?:\.\d+)?)$',  # Number at end of string
-            r':\s*(\d+(?:\.\d+)?)',  # Number after colon
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                try:
-                    return float(match.group(1)) if '.' in match.group(1) else int(match.group(1))
-                except ValueError:
-                    continue
-        
-        # If no pattern matches, look for any number in the response
-        numbers = re.findall(r'\d+(?:\.\d+)?', response)
-        if numbers:
-            try:
-                return float(numbers[-1]) if '.' in numbers[-1] else int(numbers[-1])
-            except ValueError:
-                pass
-        
-        return None
+        return _extract_result(response)
     
-    def _validate_reasoning_chain(self, reasoning_steps, original_query):
+    def _validate_reasoning_chain(self, reasoning_steps, original_query, query_keywords=None):
         """Validate the logical flow and completeness of reasoning steps"""
-        
-        validation = {
-            'step_count': len(reasoning_steps),
-            'logical_consistency': True,
-            'completeness_score': 0,
-            'step_issues': [],
-            'missing_steps': [],
-            'reasoning_quality': 'Good'
-        }
-        
-        # Expected reasoning flow patterns
-        expected_patterns = {
-            'mathematical': ['Query Analysis', 'Tool Selection', 'Parameter Extraction', 'Tool Execution', 'Response Generation'],
-            'weather': ['Query Analysis', 'Tool Selection', 'Parameter Extraction', 'Tool Execution', 'Response Generation'],
-            'informational': ['Query Analysis', 'Tool Selection', 'Parameter Extraction', 'Tool Execution', 'Response Generation']
-        }
-        
-        actual_steps = [step.get('step', '') for step in reasoning_steps]
-        query_type = self._determine_query_type(original_query)
-        expected_steps = expected_patterns.get(query_type, expected_patterns['informational'])
-        
-        # Check for missing critical steps (be more lenient)
-        critical_steps = ['Query Analysis', 'Tool Selection', 'Tool Execution']  # Reduced to truly critical steps
-        for critical_step in critical_steps:
-            if not any(critical_step.lower() in actual_step.lower() for actual_step in actual_steps):
-                validation['missing_steps'].append(critical_step)
-        
-        # Validate individual steps (be more forgiving)
-        for i, step in enumerate(reasoning_steps):
-            step_content = step.get('content', '')
-            step_name = step.get('step', '')
-            
-            # Only flag very short steps
-            if len(step_content) < 5:
-                validation['step_issues'].append(f"Step {i+1} ({step_name}): Very minimal content")
-            
-            # Skip connection checking as it was too strict
-        
-        # Calculate completeness score (more generous)
-        if len(critical_steps) > 0:
-            completion_ratio = (len(critical_steps) - len(validation['missing_steps'])) / len(critical_steps)
-        else:
-            completion_ratio = 1.0
-            
-        # Boost score if we have any reasonable number of steps
-        if len(actual_steps) >= 3:
-            completion_ratio = max(completion_ratio, 0.8)  # At least 80% if we have 3+ steps
-        
-        validation['completeness_score'] = int(completion_ratio * 100)
-        
-        # Determine overall reasoning quality (more lenient)
-        if validation['completeness_score'] >= 80 and len(validation['step_issues']) == 0:
-            validation['reasoning_quality'] = 'Excellent'
-        elif validation['completeness_score'] >= 60:
-            validation['reasoning_quality'] = 'Good'
-        elif validation['completeness_score'] >= 40:
-            validation['reasoning_quality'] = 'Acceptable'
-        else:
-            validation['reasoning_quality'] = 'Poor'
-            validation['logical_consistency'] = False
-        
-        return validation
+        # The checks only look at step names and whether each step's content is
+        # very short, so that outline is all the memoised check needs
+        outline = tuple((step.get('step', ''), len(step.get('content', '')) < 5) for step in reasoning_steps)
+        validation = _check_reasoning_chain(outline)
+        return dict(validation, step_issues=list(validation['step_issues']),
+                    missing_steps=list(validation['missing_steps']))
     
-    def _determine_query_type(self, query):
+    def _determine_query_type(self, query, query_keywords=None):
         """Determine the type of query for validation purposes"""
-        query_lower = query.lower()
+        if query_keywords is None:
+            query_keywords = _query_keywords(query)
         
-        if any(word in query_lower for word in ['calculate', 'math', '+', '-', '*', '/']):
+        if query_keywords & _MATH_KEYWORDS:
             return 'mathematical'
-        elif any(word in query_lower for word in ['weather', 'temperature']):
+        elif query_keywords & _WEATHER_KEYWORDS:
             return 'weather'
         else:
             return 'informational'
     
-    def _steps_are_connected(self, prev_step, curr_step):
-        """Check if two consecutive reasoning steps are logically connected"""
-        prev_content = prev_step.get('content', '').lower()
-        curr_content = curr_step.get('content', '').lower()
-        
-        # Simple heuristic: look for related keywords or concepts
-        prev_words = set(prev_content.split())
-        curr_words = set(curr_content.split())
-        
-        # If they share some words or one mentions the other's topic, consider them connected
-        overlap = len(prev_words.intersection(curr_words))
-        return overlap > 0 or len(curr_content) > 15  # Basic connection check
+    @staticmethod
+    def _step_tokens(reasoning_steps):
+        """Lowercased word set of each step's content, built once per chain for _steps_are_connected"""
+        return [frozenset(step.get('content', '').lower().split()) for step in reasoning_steps]
     
-    def _ai_powered_validation(self, query, response, reasoning_steps):
+    def _steps_are_connected(self, prev_tokens, curr_tokens, curr_length):
+        """Check if two consecutive reasoning steps are logically connected, given their _step_tokens"""
+        # If they share some words or the later step says enough on its own, consider them connected
+        return not prev_tokens.isdisjoint(curr_tokens) or curr_length > 15  # Basic connection check
+    
+    def _ai_powered_validation(self, validation_input, reasoning_steps):
         """Smart rule-based validation (no API calls needed)"""
+        _, response, response_lower, response_length, query_keywords = validation_input
         
         validation_result = {
             'ai_confidence': 0,
@@ -335,12 +525,9 @@ class ReflectorAgent:
         issues_found = []
         positive_indicators = []
         
-        query_lower = query.lower()
-        response_lower = response.lower()
-        
         # Mathematical query validation
-        if any(word in query_lower for word in ['calculate', 'math', '+', '-', '*', '/']):
-            if re.search(r'\d+', response):
+        if query_keywords & _MATH_KEYWORDS:
+            if _DIGITS_RE.search(response):
                 positive_indicators.append("Contains numerical result for math query")
                 validation_result['ai_confidence'] = 85
             else:
@@ -348,9 +535,8 @@ class ReflectorAgent:
                 validation_result['ai_confidence'] = 30
         
         # Weather query validation  
-        elif any(word in query_lower for word in ['weather', 'temperature', 'climate']):
-            weather_words = ['temperature', 'degrees', 'weather', 'sunny', 'cloudy', 'rain', 'celsius', 'fahrenheit']
-            if any(word in response_lower for word in weather_words):
+        elif query_keywords & _WEATHER_KEYWORDS or 'climate' in query_keywords:
+            if _WEATHER_DETAIL_RE.search(response_lower):
                 positive_indicators.append("Contains weather-related information")
                 validation_result['ai_confidence'] = 80
             else:
@@ -358,8 +544,8 @@ class ReflectorAgent:
                 validation_result['ai_confidence'] = 40
         
         # Information/knowledge queries
-        elif any(word in query_lower for word in ['what', 'who', 'where', 'when', 'why', 'how', 'explain', 'define']):
-            if len(response) > 20:
+        elif query_keywords & _QUESTION_WORDS or 'explain' in query_keywords or 'define' in query_keywords:
+            if response_length > 20:
                 positive_indicators.append("Provides substantial informational content")
                 validation_result['ai_confidence'] = 75
             else:
@@ -372,14 +558,18 @@ class ReflectorAgent:
             validation_result['ai_confidence'] = 70
         
         # Check response quality indicators
-        if len(response) > 100:
+        if response_length > 100:
             positive_indicators.append("Detailed response provided")
-        elif len(response) < 10:
+        elif response_length < 10:
             issues_found.append("Response appears too brief")
             validation_result['ai_confidence'] -= 20
         
         # Check for tool usage consistency
-        tool_mentioned = any(tool in str(reasoning_steps).lower() for tool in ['calculator', 'weather', 'search', 'news'])
+        # Look at each step's text directly rather than at repr() of the whole list
+        tool_mentioned = any(
+            _TOOL_NAME_RE.search(f"{step.get('step', '')}\n{step.get('content', '')}".lower())
+            for step in reasoning_steps
+        )
         if tool_mentioned:
             positive_indicators.append("Appropriate tool usage detected in reasoning")
             validation_result['ai_confidence'] += 5
@@ -401,12 +591,8 @@ class ReflectorAgent:
     def _make_validation_decision(self, answer_analysis, reasoning_validation, ai_validation):
         """Make final validation decision combining all analysis"""
         
-        decision = {
-            'is_correct': True,
-            'confidence': 85,  # Default to high confidence for correct answers
-            'reasoning': '',
-            'suggestions': []
-        }
+        confidence = 85  # Default to high confidence for correct answers
+        suggestions = []
         
         reasoning_parts = []
         major_issues = []
@@ -416,10 +602,10 @@ class ReflectorAgent:
             math_val = answer_analysis['math_validation']
             if math_val['is_correct']:
                 reasoning_parts.append("✅ Mathematical calculation verified as correct")
-                decision['confidence'] = 90  # High confidence for verified math
+                confidence = 90  # High confidence for verified math
             else:
                 major_issues.append(f"❌ Mathematical error: Expected {math_val['expected_result']}, got {math_val['provided_result']}")
-                decision['confidence'] = 30
+                confidence = 30
         
         # Check answer type and content appropriateness
         if answer_analysis['answer_type'] == 'mathematical':
@@ -437,7 +623,7 @@ class ReflectorAgent:
         elif answer_analysis['answer_type'] == 'informational':
             if answer_analysis['contains_factual_info']:
                 reasoning_parts.append("Contains appropriate factual information")
-            elif len(answer_analysis.get('response_length', 0)) < 20:
+            elif answer_analysis.get('response_length', 0) < 20:
                 major_issues.append("Informational query has very brief response")
         
         # Check reasoning quality (lower priority)
@@ -455,37 +641,37 @@ class ReflectorAgent:
             ai_decision = ai_validation.get('ai_decision', 'uncertain')
             if ai_decision == 'correct':
                 reasoning_parts.append("AI model confirms answer correctness")
-                decision['confidence'] = min(decision['confidence'] + 5, 95)
+                confidence = min(confidence + 5, 95)
             elif ai_decision == 'incorrect':
                 # AI disagreement is a concern but not decisive
                 reasoning_parts.append("AI model has concerns about the answer")
-                decision['confidence'] = max(decision['confidence'] - 15, 40)
+                confidence = max(confidence - 15, 40)
         else:
             reasoning_parts.append("AI validation unavailable")
         
         # Make final decision based on major issues only
         if major_issues:
-            decision['is_correct'] = False
-            decision['confidence'] = max(decision['confidence'] - 30, 20)
-            decision['reasoning'] = "❌ ANSWER FLAGGED: " + " | ".join(major_issues)
-            decision['suggestions'].extend(major_issues)
+            is_correct = False
+            confidence = max(confidence - 30, 20)
+            reasoning = "❌ ANSWER FLAGGED: " + " | ".join(major_issues)
+            suggestions.extend(major_issues)
         else:
-            decision['is_correct'] = True
-            decision['reasoning'] = "✅ ANSWER VALIDATED: " + " | ".join(reasoning_parts)
+            is_correct = True
+            reasoning = "✅ ANSWER VALIDATED: " + " | ".join(reasoning_parts)
         
         # Only add minor suggestions if there are no major issues
         if not major_issues:
-            # Add minor suggestions from potential issues (non-blocking)
-            minor_issues = answer_analysis.get('potential_issues', [])
-            if minor_issues:
-                # Filter out issues that aren't really problems
-                filtered_issues = []
-                for issue in minor_issues:
-                    if 'lacks clear result format' not in issue and 'too brief' not in issue:
-                        filtered_issues.append(issue)
-                decision['suggestions'].extend(filtered_issues[:2])  # Max 2 minor suggestions
-        
-        return decision
+            # Add minor suggestions from potential issues (non-blocking),
+            # skipping issues that aren't really problems; max 2 minor suggestions
+            minor_added = 0
+            for issue in answer_analysis.get('potential_issues', ()):
+                if 'lacks clear result format' not in issue and 'too brief' not in issue:
+                    suggestions.append(issue)
+                    minor_added += 1
+                    if minor_added == 2:
+                        break
+        
+        return _Decision(is_correct, confidence, reasoning, suggestions)
     
     def get_validation_summary(self):
         """Get a summary of all validations performed"""
@@ -494,12 +680,12 @@ class ReflectorAgent:
             return {"message": "No validations performed yet"}
             
         total_validations = len(self.validation_history)
-        correct_count = sum(1 for v in self.validation_history if v['validation_decision'])
-        avg_confidence = sum(v['confidence_level'] for v in self.validation_history) / total_validations
+        correct_count = self._correct_count
+        avg_confidence = self._confidence_sum / total_validations
         
         accuracy_rate = (correct_count / total_validations) * 100
         
-        recent_validations = self.validation_history[-5:]  # Last 5 validations
+        recent_validations = list(islice(reversed(self.validation_history), 5))  # Last 5 validations
         
         return {
             'total_validations': total_validations,
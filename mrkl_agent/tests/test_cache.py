@@ -0,0 +1,73 @@
+"""
+Tests for LLMCache: key normalization, TTL expiry, LRU eviction and hit counting
+"""
+
+import cache
+from cache import LLMCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return LLMCache(**kwargs), clock
+
+
+def test_key_ignores_case_spacing_and_trailing_punctuation(monkeypatch):
+    llm_cache, _ = make_cache(monkeypatch)
+    llm_cache.set("What is Python?", "a language")
+    assert llm_cache.get("what  is python") == "a language"
+    assert llm_cache.get("WHAT IS PYTHON!") == "a language"
+    assert llm_cache.get("What is Java?") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    llm_cache, clock = make_cache(monkeypatch, ttl_seconds=300)
+    llm_cache.set("weather in london", "sunny")
+    clock.now += 300
+    assert llm_cache.get("weather in london") == "sunny"
+    clock.now += 1
+    assert llm_cache.get("weather in london") is None
+    # The expired entry is dropped, not just hidden
+    assert len(llm_cache._entries) == 0
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    llm_cache, _ = make_cache(monkeypatch, max_entries=2)
+    llm_cache.set("a", 1)
+    llm_cache.set("b", 2)
+    # Reading "a" makes "b" the oldest
+    assert llm_cache.get("a") == 1
+    llm_cache.set("c", 3)
+    assert llm_cache.get("b") is None
+    assert llm_cache.get("a") == 1
+    assert llm_cache.get("c") == 3
+
+
+def test_get_or_compute_and_hit_rate(monkeypatch):
+    llm_cache, _ = make_cache(monkeypatch)
+    calls = []
+
+    def compute(query):
+        calls.append(query)
+        return query.upper()
+
+    assert llm_cache.hit_rate() == 0.0
+    assert llm_cache.get_or_compute("hello", compute) == "HELLO"
+    assert llm_cache.get_or_compute("Hello.", compute) == "HELLO"
+    assert calls == ["hello"]
+    assert llm_cache.hit_rate() == 0.5
+
+
+def test_clear(monkeypatch):
+    llm_cache, _ = make_cache(monkeypatch)
+    llm_cache.set("a", 1)
+    llm_cache.clear()
+    assert llm_cache.get("a") is None
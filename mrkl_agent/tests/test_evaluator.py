@@ -0,0 +1,64 @@
+"""
+Tests for the AST-walking arithmetic evaluators in the calculator tool and the reflector's math check
+"""
+
+import pytest
+
+from tools import Calculator, _evaluate
+from reflector_agent import _safe_eval
+
+EVALUATORS = [_evaluate, _safe_eval]
+
+
+@pytest.mark.parametrize("evaluate", EVALUATORS)
+@pytest.mark.parametrize("expression, expected", [
+    ("2+2", 4),
+    ("25 * 4 + 100", 200),
+    ("7 / 2", 3.5),
+    ("7 // 2", 3),
+    ("-(3 - 5)", 2),
+    ("2 ** 10", 1024),
+    ("(-3) ** 3", -27),
+    ("2 ** -2", 0.25),
+    ("10 ** 1000", 10 ** 1000),
+])
+def test_arithmetic(evaluate, expression, expected):
+    """Plain arithmetic evaluates like Python would"""
+    assert evaluate(expression) == expected
+
+
+@pytest.mark.parametrize("evaluate", EVALUATORS)
+@pytest.mark.parametrize("expression", [
+    "x + 1",
+    "__import__('os')",
+    "abs(-1)",
+    "(1).real",
+    "[1, 2]",
+    "'a' * 3",
+    "1 if 1 else 2",
+])
+def test_rejects_names_and_calls(evaluate, expression):
+    """Anything beyond numbers and arithmetic operators is refused, not evaluated"""
+    with pytest.raises(TypeError):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize("evaluate", EVALUATORS)
+@pytest.mark.parametrize("expression", [
+    "9 ** 9 ** 9",
+    "2 ** 1001",
+    "2 ** -5000",
+    "(2 ** 1000) ** 1000",
+    "(10 ** 1000) ** 200",
+])
+def test_rejects_huge_powers(evaluate, expression):
+    """Powers that would take minutes to compute are turned away up front"""
+    with pytest.raises(ValueError):
+        evaluate(expression)
+
+
+def test_calculator_reports_rejected_power():
+    """The calculator tool turns the guard's error into a message instead of hanging"""
+    result = Calculator().execute("9^9^9")
+    assert result.startswith("Error calculating 9^9^9")
+    assert "too large" in result
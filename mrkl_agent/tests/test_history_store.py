@@ -0,0 +1,88 @@
+"""
+Tests for ChatArchive: paging older turns back in, per-session isolation, pruning and file privacy
+"""
+
+import os
+import stat
+
+import history_store
+from agent import ReasoningStep
+from history_store import ChatArchive
+
+
+def make_entry(n):
+    return {
+        'query': f"query {n}",
+        'result': {'response': f"answer {n}", 'reasoning_steps': [ReasoningStep("Tool Selection", f"step {n}")]},
+        'timestamp': 1000.0 + n,
+    }
+
+
+def queries(entries):
+    return [entry['query'] for entry in entries]
+
+
+def test_show_older_pages(tmp_path):
+    archive = ChatArchive(path=str(tmp_path / "chat.sqlite3"))
+    for n in range(45):
+        archive.add("s1", make_entry(n))
+    assert archive.count("s1") == 45
+
+    # The app skips the newest turn (shown above the history) and widens the window per click
+    first_page = archive.recent("s1", 20, offset=1)
+    assert queries(first_page) == [f"query {n}" for n in range(43, 23, -1)]
+    assert len(archive.recent("s1", 40, offset=1)) == 40
+    # Past the end there is simply nothing more
+    assert queries(archive.recent("s1", 60, offset=1))[-1] == "query 0"
+    assert len(archive.recent("s1", 60, offset=1)) == 44
+
+
+def test_entries_round_trip_with_reasoning_steps(tmp_path):
+    archive = ChatArchive(path=str(tmp_path / "chat.sqlite3"))
+    archive.add("s1", make_entry(1))
+    (entry,) = archive.recent("s1", 1)
+    assert entry['result']['reasoning_steps'] == [ReasoningStep("Tool Selection", "step 1")]
+    assert isinstance(entry['result']['reasoning_steps'][0], ReasoningStep)
+
+
+def test_sessions_are_separate_and_clear_only_touches_one(tmp_path):
+    archive = ChatArchive(path=str(tmp_path / "chat.sqlite3"))
+    archive.add("s1", make_entry(1))
+    archive.add("s2", make_entry(2))
+    archive.clear("s1")
+    assert archive.count("s1") == 0
+    assert queries(archive.recent("s2", 10)) == ["query 2"]
+
+
+def test_old_turns_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(history_store.time, "time", lambda: now[0])
+    archive = ChatArchive(path=str(tmp_path / "chat.sqlite3"), ttl_seconds=60)
+    archive.add("abandoned", make_entry(1))
+    now[0] += 61
+    archive.add("active", make_entry(2))
+    assert archive.count("abandoned") == 0
+    assert archive.count("active") == 1
+
+
+def test_only_newest_entries_are_kept(tmp_path):
+    archive = ChatArchive(path=str(tmp_path / "chat.sqlite3"), max_entries=3)
+    for n in range(5):
+        archive.add("s1" if n % 2 else "s2", make_entry(n))
+    assert archive.count("s1") + archive.count("s2") == 3
+    assert queries(archive.recent("s2", 10)) == ["query 4", "query 2"]
+
+
+def test_default_file_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("MRKL_CHAT_ARCHIVE", raising=False)
+    archive = ChatArchive()
+    assert archive.path.startswith(str(tmp_path))
+    assert stat.S_IMODE(os.stat(archive.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(archive.path)).st_mode) == 0o700
+
+
+def test_path_from_environment(tmp_path, monkeypatch):
+    path = str(tmp_path / "custom.sqlite3")
+    monkeypatch.setenv("MRKL_CHAT_ARCHIVE", path)
+    assert ChatArchive().path == path
@@ -0,0 +1,28 @@
+"""
+Tests for _search_cache_key: rephrasings share a Search cache entry, different topics never do
+"""
+
+import pytest
+
+from tools import _search_cache_key
+
+
+@pytest.mark.parametrize("first, second", [
+    ("what is python", "What's Python?"),
+    ("Tell me about Rust.", "rust"),
+    ("python, please", "Python"),
+    ('explain "kubernetes"', "kubernetes"),
+])
+def test_rephrasings_share_a_key(first, second):
+    assert _search_cache_key(first) == _search_cache_key(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("c#", "c"),
+    ("f#", "f"),
+    (".net", "net"),
+    ("c++ tutorial", "c tutorial"),
+    ("what is c++?", "what is c?"),
+])
+def test_symbols_keep_topics_apart(first, second):
+    assert _search_cache_key(first) != _search_cache_key(second)
@@ -1,15 +1,42 @@
 import requests
+import ast
+import json
 import math
+import operator
 import os
-import wikipedia
-from datetime import datetime
+import re
+from functools import lru_cache
+from urllib.parse import quote
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import LLMCache
+
+try:
+    import orjson  # optional; parses the API responses' bytes in C
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Load environment variables
 load_dotenv()
 
+# One pooled session for every tool, so repeat calls to the same host reuse
+# the open connection instead of reconnecting each time. Transient server
+# errors are retried; the final response is still handed back to the caller.
+_SESSION = requests.Session()
+_SESSION.headers.update({'User-Agent': 'mrkl-agent/1.0', 'Accept-Encoding': 'gzip, deflate'})
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[429, 500, 502, 503, 504],
+                                         raise_on_status=False))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
 class MRKLTool:
     """Base class for MRKL tools"""
+    # Tools hold a fixed handful of attributes; subclasses list only the ones they add
+    __slots__ = ('name', 'description')
+    
     def __init__(self, name, description):
         self.name = name
         self.description = description
@@ -17,7 +44,59 @@ class MRKLTool:
     def execute(self, *args, **kwargs):
         raise NotImplementedError
 
+# Largest power the calculator will compute. Integer powers are exact, so something like
+# 9**9**9 would otherwise run for minutes building a number with millions of digits.
+_CALC_MAX_EXPONENT = 1000
+_CALC_MAX_POWER_BITS = 100_000
+
+def _bounded_pow(base, exponent):
+    if abs(exponent) > _CALC_MAX_EXPONENT:
+        raise ValueError(f"Exponent {exponent} is too large (limit {_CALC_MAX_EXPONENT})")
+    if isinstance(base, int) and isinstance(exponent, int) and base.bit_length() * exponent > _CALC_MAX_POWER_BITS:
+        raise ValueError("Result of the power is too large")
+    return operator.pow(base, exponent)
+
+# Arithmetic the calculator evaluates; any other syntax in an expression is rejected
+_CALC_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _bounded_pow,
+}
+_CALC_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+# '^' means power, and π is spelled out as a number; all rewritten in one regex pass
+_PI_STR = str(math.pi)
+_CALC_SUBSTITUTIONS = {'^': '**', 'π': _PI_STR, 'pi': _PI_STR}
+_CALC_SUBSTITUTION_RE = re.compile(r'\^|π|pi')
+# Everything a normalized arithmetic expression can contain: operators, brackets
+# and the characters of Python number literals (1.5e3, 0x1F, 1_000). Anything
+# else, like a whole sentence, is turned away before it reaches the parser.
+_CALC_SHAPE_RE = re.compile(r'[\d\s+\-*/%().eExXoObBa-fA-F_]+')
+
+def _normalize_expression(expression):
+    """Rewrite a calculator input into the Python arithmetic _evaluate accepts"""
+    return _CALC_SUBSTITUTION_RE.sub(lambda match: _CALC_SUBSTITUTIONS[match.group()], expression.strip())
+
+@lru_cache(maxsize=2048)
+def _evaluate(expression):
+    """Evaluate a normalized arithmetic expression by walking its AST instead of calling eval()"""
+    return _evaluate_node(ast.parse(expression, mode='eval').body)
+
+def _evaluate_node(node):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _CALC_BINARY_OPS:
+        return _CALC_BINARY_OPS[type(node.op)](_evaluate_node(node.left), _evaluate_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _CALC_UNARY_OPS:
+        return _CALC_UNARY_OPS[type(node.op)](_evaluate_node(node.operand))
+    raise TypeError(f"Unsupported expression element: {type(node).__name__}")
+
 class Calculator(MRKLTool):
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(
             "calculator",
@@ -27,47 +106,56 @@ class Calculator(MRKLTool):
     def execute(self, expression):
         """Safely evaluate mathematical expressions"""
         try:
-            # Replace common math functions
-            safe_expression = expression.replace('^', '**')
-            safe_expression = safe_expression.replace('π', str(math.pi))
-            safe_expression = safe_expression.replace('pi', str(math.pi))
-            
-            # Only allow safe operations
-            allowed_chars = set('0123456789+-*/.() ')
-            if all(c in allowed_chars or c.isalnum() for c in safe_expression):
-                result = eval(safe_expression)
-                return f"Calculation: {expression} = {result}"
-            else:
+            normalized = _normalize_expression(expression)
+            if not _CALC_SHAPE_RE.fullmatch(normalized):
                 return "Error: Invalid characters in expression"
+            
+            # Results are memoised per normalized expression, so repeats skip the parse
+            # (only numbers and arithmetic operators are evaluated)
+            result = _evaluate(normalized)
+            return f"Calculation: {expression} = {result}"
         except Exception as e:
             return f"Error calculating {expression}: {str(e)}"
 
+# Weather changes on the scale of minutes, so a recent report for a city is reused
+WEATHER_CACHE_TTL_SECONDS = 300
+
 class Weather(MRKLTool):
+    __slots__ = ('api_key', 'cache')
+    
     def __init__(self):
         super().__init__(
             "weather", 
             "Get current weather information for any city. Input should be a city name like 'London' or 'New York'"
         )
         self.api_key = os.getenv('OPENWEATHER_API_KEY')
+        # Only successful reports are stored, so a failed lookup is retried next time
+        self.cache = LLMCache(max_entries=512, ttl_seconds=WEATHER_CACHE_TTL_SECONDS)
     
     def execute(self, city):
         """Get real weather info using OpenWeatherMap API"""
+        cached = self.cache.get(city)
+        if cached is not None:
+            return cached
+        
         if not self.api_key or self.api_key == 'your_openweather_api_key_here':
             # Fallback to free weather service
             return self._get_free_weather(city)
         
         try:
             url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.api_key}&units=metric"
-            response = requests.get(url, timeout=10)
+            response = _SESSION.get(url, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = _json_loads(response.content)
                 temp = data['main']['temp']
                 desc = data['weather'][0]['description'].title()
                 humidity = data['main']['humidity']
                 feels_like = data['main']['feels_like']
                 
-                return f"Current weather in {city.title()}: {temp}°C (feels like {feels_like}°C), {desc}, Humidity: {humidity}%"
+                report = f"Current weather in {city.title()}: {temp}°C (feels like {feels_like}°C), {desc}, Humidity: {humidity}%"
+                self.cache.set(city, report)
+                return report
             else:
                 return f"Could not get weather for {city}. Please check city name."
         except Exception as e:
@@ -78,113 +166,187 @@ class Weather(MRKLTool):
         try:
             # Use wttr.in free weather API
             url = f"http://wttr.in/{city}?format=%C+%t+%h"
-            response = requests.get(url, timeout=10)
+            response = _SESSION.get(url, timeout=10)
             
             if response.status_code == 200:
                 weather_data = response.text.strip()
-                return f"Current weather in {city.title()}: {weather_data}"
+                report = f"Current weather in {city.title()}: {weather_data}"
+                self.cache.set(city, report)
+                return report
             else:
                 return f"Could not get weather for {city}"
         except Exception as e:
             return f"Weather service temporarily unavailable for {city}"
 
+# Search results go stale slowly; news is refreshed every few minutes
+SEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60
+NEWS_CACHE_TTL_SECONDS = 10 * 60
+
+# Words that change how a question is phrased but not what it asks for
+_QUERY_FILLER_WORDS = frozenset({'what', 'who', 'is', 'are', 'was', 'the', 'a', 'an', 'please',
+                                 'tell', 'me', 'about', 'explain', 'define'})
+# Request words _clean_search_query drops before searching Wikipedia
+_SEARCH_STOP_WORDS = frozenset({'tell', 'me', 'about', 'explain', 'define'})
+# Words are split on whitespace only, so symbols that name things ("c++", "c#", ".net") stay in the key
+_QUERY_WORD_RE = re.compile(r"\S+")
+_QUERY_WORD_TRAILING = "?.!,;:"
+_QUERY_WORD_QUOTES = "\"'()"
+
+@lru_cache(maxsize=None)
+def _load_wikipedia():
+    """Import the wikipedia package on first use; most queries never reach it"""
+    import wikipedia
+    # Set the language once: set_lang() also empties the package's own result caches
+    wikipedia.set_lang("en")
+    return wikipedia
+
+_SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+# Lead-section extract of one article as a small JSON document
+_WIKIPEDIA_SUMMARY_URL = "https://en.wikipedia.org/api/rest_v1/page/summary/{}"
+
+def _first_sentences(text, count=3):
+    return ' '.join(_SENTENCE_BREAK_RE.split(text.strip(), maxsplit=count)[:count])
+
+def _wikipedia_article(title):
+    """Return the URL and the first 3 summary sentences of the article with this exact title"""
+    # The REST summary endpoint answers in one small request on the shared session
+    try:
+        response = _SESSION.get(_WIKIPEDIA_SUMMARY_URL.format(quote(title.replace(' ', '_'), safe='')), timeout=5)
+        if response.status_code == 200:
+            data = _json_loads(response.content)
+            if data.get('type') == 'standard':
+                return data['content_urls']['desktop']['page'], _first_sentences(data['extract'])
+    except (requests.RequestException, ValueError, KeyError, TypeError):
+        pass
+    
+    # Disambiguation pages and endpoint failures go through the wikipedia package,
+    # which raises the errors _search_wikipedia handles. Titles come from
+    # wikipedia.search(), so they are exact and need no auto-suggest lookup.
+    page = _load_wikipedia().page(title, auto_suggest=False)
+    return page.url, _first_sentences(page.summary)
+
+def _format_organic_results(results, no_snippet="No description available"):
+    """Number the top 3 SerpAPI organic results as title / snippet / source blocks"""
+    return "\n\n".join(
+        f"{i}. {result.get('title', 'No title')}\n   {result.get('snippet', no_snippet)}\n   Source: {result.get('link', '')}"
+        for i, result in enumerate(results[:3], 1)
+    )
+
+def _iter_news_items(items, limit=5):
+    """Yield SerpAPI news items numbered as title (date) / source / snippet / link blocks"""
+    for i, news in enumerate(items[:limit], 1):
+        title = news.get("title", "No title")
+        snippet = news.get("snippet", "")
+        source = news.get("source", "Unknown source")
+        date = news.get("date", "")
+        link = news.get("link", "")
+        
+        news_item = f"{i}. {title}"
+        if date:
+            news_item += f" ({date})"
+        news_item += f"\n   Source: {source}"
+        if snippet:
+            news_item += f"\n   {snippet}"
+        if link:
+            news_item += f"\n   Link: {link}"
+        
+        yield news_item
+
+def _format_news_results(items, limit=5):
+    return "\n\n".join(_iter_news_items(items, limit))
+
+def _search_cache_key(query):
+    """
+    Reduce a query to the words that carry its meaning, so rephrasings like
+    "what is python" and "What's Python?" share one cache entry
+    """
+    words = []
+    for word in _QUERY_WORD_RE.findall(query.lower()):
+        word = word.rstrip(_QUERY_WORD_TRAILING).strip(_QUERY_WORD_QUOTES)
+        if word.endswith("'s"):
+            word = word[:-2]
+        if word:
+            words.append(word)
+    key_words = [word for word in words if word not in _QUERY_FILLER_WORDS]
+    return ' '.join(key_words or words)
+
 class Search(MRKLTool):
+    __slots__ = ('serpapi_key', 'cache')
+    
     def __init__(self):
         super().__init__(
             "search",
             "Search for real-time information about any topic using web search and Wikipedia. Input should be a topic or question like 'latest news about AI' or 'what is Python'"
         )
         self.serpapi_key = os.getenv('SERPAPI_KEY')
+        # Keyed by _search_cache_key; only results that were actually found are stored
+        self.cache = LLMCache(max_entries=512, ttl_seconds=SEARCH_CACHE_TTL_SECONDS)
     
-    def execute(self, query):
-        """Search for real information using SerpAPI and Wikipedia"""
+    def execute(self, query, include_news=False):
+        """
+        Search for real information using SerpAPI and Wikipedia.
+        With include_news, Google's top stories from the same SerpAPI call are
+        appended, which saves a separate News call for news-adjacent queries.
+        """
+        cache_key = _search_cache_key(query)
+        if include_news:
+            cache_key += ' +news'
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Try SerpAPI first for real-time web results
         if self.serpapi_key:
-            serpapi_result = self._search_serpapi(query)
+            serpapi_result = self._search_serpapi(query, include_news)
             if serpapi_result:
+                self.cache.set(cache_key, serpapi_result)
                 return serpapi_result
         
         # Fallback to Wikipedia
-        return self._search_wikipedia(query)
+        return self._search_wikipedia(query, cache_key)
     
-    def _search_serpapi(self, query):
+    def _search_serpapi(self, query, include_news=False):
         """Search using SerpAPI for real-time web results"""
-        try:
-            from serpapi import GoogleSearch
-            
-            params = {
-                "q": query,
-                "api_key": self.serpapi_key,
-                "engine": "google",
-                "num": 3
-            }
-            
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            
-            if "organic_results" in results and results["organic_results"]:
-                # Format the top 3 results
-                search_results = []
-                for i, result in enumerate(results["organic_results"][:3], 1):
-                    title = result.get("title", "No title")
-                    snippet = result.get("snippet", "No description available")
-                    link = result.get("link", "")
-                    
-                    search_results.append(f"{i}. {title}\n   {snippet}\n   Source: {link}")
-                
-                return f"Real-time search results for '{query}':\n\n" + "\n\n".join(search_results)
-            
-            return None
-            
-        except ImportError:
-            # serpapi package not installed, try requests
-            return self._search_serpapi_requests(query)
-        except Exception as e:
-            print(f"SerpAPI search failed: {e}")
-            return None
-    
-    def _search_serpapi_requests(self, query):
-        """Backup SerpAPI search using requests"""
         try:
             url = "https://serpapi.com/search"
             params = {
                 "q": query,
                 "api_key": self.serpapi_key,
                 "engine": "google",
-                "num": 3
+                "num": 3,
+                "hl": "en",  # Stable English results for the same query
+                "output": "json"
             }
             
-            response = requests.get(url, params=params, timeout=15)
+            response = _SESSION.get(url, params=params, timeout=15)
             
             if response.status_code == 200:
-                results = response.json()
+                results = _json_loads(response.content)
                 
+                sections = []
                 if "organic_results" in results and results["organic_results"]:
-                    search_results = []
-                    for i, result in enumerate(results["organic_results"][:3], 1):
-                        title = result.get("title", "No title")
-                        snippet = result.get("snippet", "No description available")
-                        link = result.get("link", "")
-                        
-                        search_results.append(f"{i}. {title}\n   {snippet}\n   Source: {link}")
-                    
-                    return f"Real-time search results for '{query}':\n\n" + "\n\n".join(search_results)
+                    sections.append(f"Real-time search results for '{query}':\n\n" + _format_organic_results(results["organic_results"]))
+                # The news box arrives in the same response, so it costs no extra call
+                stories = include_news and (results.get("top_stories") or results.get("news_results"))
+                if stories:
+                    sections.append(f"Top stories for '{query}':\n\n" + _format_news_results(stories))
+                if sections:
+                    return "\n\n".join(sections)
             
             return None
             
         except Exception as e:
-            print(f"SerpAPI requests search failed: {e}")
+            print(f"SerpAPI search failed: {e}")
             return None
     
-    def _search_wikipedia(self, query):
+    def _search_wikipedia(self, query, cache_key=None):
         """Fallback Wikipedia search"""
         try:
+            wikipedia = _load_wikipedia()
+            
             # Clean the query
             clean_query = self._clean_search_query(query)
             
-            # Set Wikipedia language to English
-            wikipedia.set_lang("en")
-            
             # Search for the topic
             search_results = wikipedia.search(clean_query, results=3)
             
@@ -193,17 +355,21 @@ class Search(MRKLTool):
             
             # Get the first result
             try:
-                page = wikipedia.page(search_results[0])
-                summary = wikipedia.summary(search_results[0], sentences=3)
+                url, summary = _wikipedia_article(search_results[0])
                 
-                return f"Wikipedia information about '{query}':\n\n{summary}\n\nSource: {page.url}"
+                result = f"Wikipedia information about '{query}':\n\n{summary}\n\nSource: {url}"
+                if cache_key is not None:
+                    self.cache.set(cache_key, result)
+                return result
                 
             except wikipedia.DisambiguationError as e:
                 # If there are multiple pages, try the first option
                 try:
-                    page = wikipedia.page(e.options[0])
-                    summary = wikipedia.summary(e.options[0], sentences=3)
-                    return f"Wikipedia information about '{query}' ({e.options[0]}):\n\n{summary}\n\nSource: {page.url}"
+                    url, summary = _wikipedia_article(e.options[0])
+                    result = f"Wikipedia information about '{query}' ({e.options[0]}):\n\n{summary}\n\nSource: {url}"
+                    if cache_key is not None:
+                        self.cache.set(cache_key, result)
+                    return result
                 except:
                     return f"Multiple articles found for '{query}'. Please be more specific. Options: {', '.join(e.options[:5])}"
             
@@ -216,10 +382,8 @@ class Search(MRKLTool):
     def _clean_search_query(self, query):
         """Clean and optimize the search query"""
         # Remove question words but keep important context
-        stop_words = ['tell', 'me', 'about', 'explain', 'define']
-        
         words = query.lower().split()
-        cleaned_words = [word for word in words if word not in stop_words]
+        cleaned_words = [word for word in words if word not in _SEARCH_STOP_WORDS]
         
         # If all words were removed, return original query
         if not cleaned_words:
@@ -228,75 +392,74 @@ class Search(MRKLTool):
         return ' '.join(cleaned_words)
 
 class News(MRKLTool):
+    __slots__ = ('serpapi_key', 'cache')
+    
     def __init__(self):
         super().__init__(
             "news",
             "Get latest news and current events about any topic. Input should be a news topic like 'latest AI news' or 'current events in technology'"
         )
         self.serpapi_key = os.getenv('SERPAPI_KEY')
+        self.cache = LLMCache(max_entries=256, ttl_seconds=NEWS_CACHE_TTL_SECONDS)
     
     def execute(self, query):
         """Get latest news using SerpAPI Google News"""
+        return ''.join(self.iter_results(query))
+    
+    def iter_results(self, query):
+        """
+        Yield the text execute() returns in pieces: the heading, then one story
+        at a time, so a caller can show the first headline before the rest.
+        """
         if not self.serpapi_key:
-            return "News search requires API key. Using general search instead."
+            yield "News search requires API key. Using general search instead."
+            return
+        
+        cache_key = _search_cache_key(query)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        # Add 'news' to query if not present
+        if 'news' not in query.lower() and 'latest' not in query.lower():
+            query = f"latest news {query}"
         
         try:
-            # Add 'news' to query if not present
-            if 'news' not in query.lower() and 'latest' not in query.lower():
-                query = f"latest news {query}"
-            
             url = "https://serpapi.com/search"
             params = {
                 "q": query,
                 "api_key": self.serpapi_key,
                 "engine": "google",
                 "tbm": "nws",  # News search
-                "num": 5
+                "num": 5,
+                "hl": "en",
+                "output": "json"
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            
-            if response.status_code == 200:
-                results = response.json()
-                
-                if "news_results" in results and results["news_results"]:
-                    news_items = []
-                    for i, news in enumerate(results["news_results"][:5], 1):
-                        title = news.get("title", "No title")
-                        snippet = news.get("snippet", "")
-                        source = news.get("source", "Unknown source")
-                        date = news.get("date", "")
-                        link = news.get("link", "")
-                        
-                        news_item = f"{i}. {title}"
-                        if date:
-                            news_item += f" ({date})"
-                        news_item += f"\n   Source: {source}"
-                        if snippet:
-                            news_item += f"\n   {snippet}"
-                        if link:
-                            news_item += f"\n   Link: {link}"
-                        
-                        news_items.append(news_item)
-                    
-                    return f"Latest news for '{query}':\n\n" + "\n\n".join(news_items)
-                
-                # Fallback to regular search results
-                elif "organic_results" in results and results["organic_results"]:
-                    search_results = []
-                    for i, result in enumerate(results["organic_results"][:3], 1):
-                        title = result.get("title", "No title")
-                        snippet = result.get("snippet", "")
-                        link = result.get("link", "")
-                        
-                        search_results.append(f"{i}. {title}\n   {snippet}\n   Source: {link}")
-                    
-                    return f"Recent information about '{query}':\n\n" + "\n\n".join(search_results)
-            
-            return f"Could not retrieve news for '{query}' at this time."
-            
+            response = _SESSION.get(url, params=params, timeout=15)
+            results = _json_loads(response.content) if response.status_code == 200 else {}
         except Exception as e:
-            return f"News search error for '{query}': {str(e)}"
+            yield f"News search error for '{query}': {str(e)}"
+            return
+        
+        if "news_results" in results and results["news_results"]:
+            pieces = [f"Latest news for '{query}':\n\n"]
+            yield pieces[0]
+            for i, news_item in enumerate(_iter_news_items(results["news_results"])):
+                pieces.append(news_item if i == 0 else "\n\n" + news_item)
+                yield pieces[-1]
+            # Cached only once every story has been produced
+            self.cache.set(cache_key, ''.join(pieces))
+        
+        # Fallback to regular search results
+        elif "organic_results" in results and results["organic_results"]:
+            result = f"Recent information about '{query}':\n\n" + _format_organic_results(results["organic_results"], no_snippet="")
+            self.cache.set(cache_key, result)
+            yield result
+        
+        else:
+            yield f"Could not retrieve news for '{query}' at this time."
 
 # Initialize tools
 calculator_tool = Calculator()
@@ -1,127 +1,367 @@
 import streamlit as st
-from groq import Groq
+import asyncio
+import hashlib
 import json
 import time
 import re
 import os
+from collections import deque
 from dotenv import load_dotenv
+from response_cache import ResponseCache
 
-# Load environment variables
-load_dotenv()
+try:
+    import uvloop
+except ImportError:
+    # uvloop is optional (and unavailable on Windows); asyncio's own loop is used instead
+    uvloop = None
+
+# Iteration history expanders drawn by default; older ones appear behind a "show all" toggle
+HISTORY_PAGE_SIZE = 5
+
+# Iterations kept in session state; the oldest are dropped so the history cannot grow without bound
+MAX_STORED_ITERATIONS = 50
+
+# Format of the timestamp stored with each iteration
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Spacing tweaks the theme settings cannot express; injected by main() on each run
+APP_CSS = """
+<style>
+.main > div {
+    padding-top: 1rem;
+}
+.stAlert {
+    margin-top: 1rem;
+}
+</style>
+"""
+
+# A streamed draft is repainted when a chunk ends a sentence or line, not on every token,
+# and at most once per interval: Groq can finish several sentences within a few milliseconds
+_SENTENCE_END_RE = re.compile(r"[.!?\n]")
+STREAM_REPAINT_INTERVAL = 0.25
+
+# Scans for the score heuristic and the template fallbacks, compiled once instead of per call
+# Tolerates "Quality score = 7" and markdown bold such as "**QUALITY SCORE:** 7"
+_QUALITY_SCORE_RE = re.compile(r"QUALITY\s*SCORE\s*[:=]?[\s*]*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_NEGATIVE_FEEDBACK_RE = re.compile(r"\b(?:poor|weak|lacking|needs improvement|unclear|confusing)\b")
+_POSITIVE_FEEDBACK_RE = re.compile(r"\b(?:excellent|great|good|clear|engaging|well-written)\b")
+_TECHNOLOGY_TOPIC_RE = re.compile(r"tech|ai|software|digital|computer|algorithm")
+_BUSINESS_TOPIC_RE = re.compile(r"business|market|company|strategy|management")
+# Bulleted or numbered lines of a critique, i.e. its actionable points
+_CRITICISM_POINT_RE = re.compile(r"^[ \t]*(?:[-*•]|\d+[.)])[ \t]+\S.*$", re.MULTILINE)
+
+# System prompts are module constants so every request starts with the same bytes,
+# which lets Groq's prompt cache reuse the prefill; per-call text goes in the user message
+GENERATOR_SYSTEM_PROMPT = """You are a professional blog writer. Generate well-structured, informative, and engaging blog content based on the user's topic.
+Make sure the blog content is:
+- Well-organized with clear introduction, body, and conclusion
+- Informative and accurate with real insights
+- Engaging and easy to read
+- Appropriate length (150-400 words)
+- Professional yet conversational tone
+- Includes practical examples or insights where relevant"""
+
+EDITOR_SYSTEM_PROMPT = """You are a professional content editor and writer. Your job is to improve existing content based on specific criticism and feedback.
+
+Instructions:
+- Carefully read the original content and the criticism provided
+- Address all the specific issues mentioned in the criticism
+- Maintain the original topic and intent while making improvements
+- Enhance clarity, engagement, structure, and overall quality
+- Keep the improved version within a similar length range
+- Make the content more polished and professional"""
+
+CRITIC_SYSTEM_PROMPT = """You are an expert content critic and editor. Your job is to provide comprehensive, constructive criticism of written content.
+
+Analyze the content across these dimensions:
+1. CLARITY & READABILITY: Is the writing clear and easy to understand?
+2. STRUCTURE & ORGANIZATION: Is the content well-organized with logical flow?
+3. ENGAGEMENT & TONE: Is it engaging and appropriate for the target audience?
+4. ACCURACY & DEPTH: Does it provide valuable, accurate information?
+5. COMPLETENESS: Are there missing elements or areas that need expansion?
+
+At the end of your analysis, provide a QUALITY SCORE from 1-10 where:
+- 1-4: Poor quality, needs major improvements
+- 5-6: Average quality, needs moderate improvements
+- 7-8: Good quality, minor improvements needed
+- 9-10: Excellent quality, ready for publication
+
+Format your response with the score at the end like: "QUALITY SCORE: X/10"
+
+Provide specific, actionable feedback with examples. Be constructive and helpful, not just critical."""
+
+# Starts with the generator prompt so both share a cached prefix
+SELF_CRITIQUE_SYSTEM_PROMPT = GENERATOR_SYSTEM_PROMPT + """
+
+After writing the post, critique it as an expert editor would: clarity, structure, engagement, accuracy and completeness, with specific, actionable suggestions. Then give it a quality score from 1-10 (1-4 poor, 5-6 average, 7-8 good, 9-10 ready for publication).
+
+Respond with a JSON object only, with exactly these fields:
+{"content": "<the blog post in markdown>", "self_critique": "<your critique in markdown>", "quality_score": <number from 1 to 10>}"""
+
+@st.cache_resource
+def get_env_api_key():
+    """GROQ_API_KEY from the environment or .env, read once per server process rather than on every rerun"""
+    load_dotenv()
+    return os.getenv("GROQ_API_KEY")
 
 def get_api_key():
     """Get API key from session state, environment, or user input"""
     # Check if API key is in session state
-    if 'groq_api_key' in st.session_state and st.session_state.groq_api_key:
-        return st.session_state.groq_api_key
+    api_key = st.session_state.get('groq_api_key')
+    if api_key:
+        return api_key
     
     # Check environment variables
-    env_key = os.getenv("GROQ_API_KEY")
+    env_key = get_env_api_key()
     if env_key:
         st.session_state.groq_api_key = env_key
         return env_key
     
     return None
 
-class ContentGeneratorAgent:
-    def __init__(self, api_key=None):
-        try:
-            if not api_key:
-                self.client = None
-                return
-                
-            self.client = Groq(api_key=api_key)
-            self.model = "llama-3.1-8b-instant"
-            # Test the connection
-            self.client.models.list()
-            
-        except Exception as e:
-            st.error(f"❌ Error loading Content Generator: {str(e)}")
-            self.client = None
+def condense_criticism(criticism, min_points=3):
+    """The bulleted and numbered points of a critique, or the whole critique if it has fewer than min_points"""
+    points = _CRITICISM_POINT_RE.findall(criticism)
+    if len(points) < min_points:
+        return criticism
+    return "\n".join(point.strip() for point in points)
+
+def record_usage(usage):
+    """Add one response's prompt and cached-prompt token counts to the session totals"""
+    if usage is None:
+        return
+    # Only bookkeeping: read defensively so a response without these fields is never discarded
+    st.session_state.prompt_tokens += getattr(usage, 'prompt_tokens', None) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    st.session_state.cached_prompt_tokens += getattr(details, 'cached_tokens', None) or 0
+
+# Groq clients shared by the generator and critic, one per event loop: each button press runs
+# on its own loop via run_async, and an httpx connection pool cannot be reused once its loop has closed
+@st.cache_resource
+def loop_groq_clients():
+    """
+    Clients by event loop, then API key. Kept as a resource rather than a module global because the
+    cached agents call into the script run that built them, while run_async belongs to the current one
+    """
+    return {}
+
+def groq_client(api_key):
+    """The Groq client for api_key on the running event loop; building one makes no request"""
+    # The SDK (httpx, pydantic) is imported on first use, so the page can render before it loads
+    from groq import AsyncGroq
     
-    def generate_content(self, prompt, max_tokens=300):
+    clients = loop_groq_clients().setdefault(asyncio.get_running_loop(), {})
+    if api_key not in clients:
+        clients[api_key] = AsyncGroq(api_key=api_key)
+    return clients[api_key]
+
+async def _with_loop_clients(coro):
+    """
+    Await coro, then close the Groq clients created on this loop. They cannot outlive it, and closing
+    them shuts their kept-alive connections down cleanly instead of leaving them to the garbage collector
+    """
+    try:
+        return await coro
+    finally:
+        for client in loop_groq_clients().pop(asyncio.get_running_loop(), {}).values():
+            await client.close()
+
+def run_async(coro):
+    """Run coro to completion on a fresh event loop, libuv-based when uvloop is installed"""
+    if uvloop is not None:
+        return uvloop.run(_with_loop_clients(coro))
+    return asyncio.run(_with_loop_clients(coro))
+
+@st.cache_resource
+def get_response_cache():
+    """One response cache for the whole server process"""
+    return ResponseCache()
+
+def report_api_error(message, error):
+    """Show a failed Groq call; a rejected key also flags the session so the sidebar offers a reset"""
+    from groq import AuthenticationError
+    
+    if isinstance(error, AuthenticationError):
+        st.session_state.api_key_rejected = True
+    st.error(f"{message}: {str(error)}")
+
+def parse_fused_answer(raw):
+    """(content, criticism) from a JSON-mode draft-plus-critique answer; ValueError if it is malformed"""
+    try:
+        result = json.loads(raw)
+        content = result['content'].strip()
+        criticism = f"{result['self_critique'].strip()}\n\n**QUALITY SCORE: {float(result['quality_score']):.1f}/10**"
+    except (TypeError, KeyError, AttributeError) as e:
+        raise ValueError(f"malformed fused answer: {e!r}") from e
+    if not content:
+        raise ValueError("fused answer has no content")
+    return content, criticism
+
+def prompt_version(messages):
+    """Short hash of the system prompt in messages; editing the prompt retires responses cached under the old one"""
+    system_prompt = "".join(message['content'] for message in messages if message['role'] == 'system')
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:12]
+
+class GroqAgent:
+    """Shared Groq plumbing for the agents: cached, optionally streamed chat completions"""
+    
+    def __init__(self, api_key=None, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.model = "llama-3.1-8b-instant"
+    
+    async def _complete(self, messages, max_tokens, temperature, placeholder=None, cache_key=None, validate=None, **options):
+        """
+        Return the cached answer for cache_key, or request one from Groq and cache it. The cache lives
+        on disk across restarts, so the temperature and system prompt version join the caller's namespace.
+        A fresh answer is passed to validate, if given, before it is cached; whatever it raises propagates
+        """
+        if cache_key is not None:
+            namespace, text = cache_key
+            cache_key = (f"{namespace}:{temperature}:{prompt_version(messages)}", text)
+        if self.cache is not None and cache_key is not None:
+            # SQLite reads and commits block, so they run in a worker thread while other drafts stream
+            cached = await asyncio.to_thread(self.cache.get, *cache_key)
+            if cached:
+                if placeholder is not None:
+                    placeholder.markdown(cached)
+                return cached
+        
+        text = await self._request(messages, max_tokens, temperature, placeholder, **options)
+        if validate is not None:
+            validate(text)
+        if self.cache is not None and cache_key is not None and text:
+            await asyncio.to_thread(self.cache.put, *cache_key, text)
+        return text
+    
+    async def _request(self, messages, max_tokens, temperature, placeholder, **options):
+        """Run one chat completion, streaming the text into placeholder when one is given"""
+        if placeholder is None:
+            chat_completion = await groq_client(self.api_key).chat.completions.create(
+                messages=messages,
+                model=self.model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=0.9,
+                **options
+            )
+            record_usage(getattr(chat_completion, 'usage', None))
+            return chat_completion.choices[0].message.content.strip()
+        
+        stream = await groq_client(self.api_key).chat.completions.create(
+            messages=messages,
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=0.9,
+            stream=True,
+            **options
+        )
+        text = ""
+        last_paint = 0.0
+        async for chunk in stream:
+            # Usage arrives on the last chunk
+            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+            if usage:
+                record_usage(usage)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                text += delta
+                if _SENTENCE_END_RE.search(delta) and time.monotonic() - last_paint >= STREAM_REPAINT_INTERVAL:
+                    placeholder.markdown(text)
+                    last_paint = time.monotonic()
+        placeholder.markdown(text)
+        return text.strip()
+
+class ContentGeneratorAgent(GroqAgent):
+    async def agenerate_content(self, prompt, max_tokens=300, placeholder=None, use_cache=True):
         """Generate content based on the given prompt using Groq"""
         try:
-            if self.client is None:
+            if not self.api_key:
                 return self._template_based_generation(prompt)
             
-            # Create a detailed prompt for blog content generation
-            system_prompt = """You are a professional blog writer. Generate well-structured, informative, and engaging blog content based on the user's topic. 
-            Make sure the blog content is:
-            - Well-organized with clear introduction, body, and conclusion
-            - Informative and accurate with real insights
-            - Engaging and easy to read
-            - Appropriate length (150-400 words)
-            - Professional yet conversational tone
-            - Includes practical examples or insights where relevant"""
-            
             user_prompt = f"Write a comprehensive and engaging blog post about: {prompt}. Make it informative, well-structured, and interesting to read."
             
             # Generate content using Groq
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
+            return await self._complete(
+                [
+                    {"role": "system", "content": GENERATOR_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
-                model=self.model,
-                max_tokens=max_tokens,
+                max_tokens,
                 temperature=0.8,
-                top_p=0.9
+                placeholder=placeholder,
+                cache_key=(f"generate:{self.model}:{max_tokens}", prompt) if use_cache else None
             )
             
-            # Extract generated content
-            generated_content = chat_completion.choices[0].message.content
-            return generated_content.strip()
-            
         except Exception as e:
-            st.error(f"Error generating content with Groq: {str(e)}")
+            report_api_error("Error generating content with Groq", e)
             return self._template_based_generation(prompt)
     
-    def improve_content(self, original_content, criticism, max_tokens=300):
+    async def agenerate_with_critique(self, prompt, max_tokens_gen=300, max_tokens_crit=400, placeholder=None, use_cache=True):
+        """Write a draft and critique it in one JSON-mode call; returns (content, criticism), where criticism is None if it fell back to plain generation"""
+        if self.api_key:
+            from groq import BadRequestError
+            
+            try:
+                user_prompt = f"Write a comprehensive and engaging blog post about: {prompt}. Make it informative, well-structured, and interesting to read."
+                
+                raw = await self._complete(
+                    [
+                        {"role": "system", "content": SELF_CRITIQUE_SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens_gen + max_tokens_crit,
+                    temperature=0.8,
+                    cache_key=(f"generate_critique:{self.model}:{max_tokens_gen}:{max_tokens_crit}", prompt) if use_cache else None,
+                    validate=parse_fused_answer,
+                    response_format={"type": "json_object"}
+                )
+                content, criticism = parse_fused_answer(raw)
+                if placeholder is not None:
+                    placeholder.markdown(content)
+                return content, criticism
+            except (ValueError, BadRequestError):
+                # A malformed answer, or Groq refusing JSON mode for this output, falls back to the two-call path
+                pass
+            except Exception as e:
+                # Anything else (a rejected key, rate limits, network) would fail the retry too
+                report_api_error("Error generating content with Groq", e)
+                return self._template_based_generation(prompt), None
+        
+        return await self.agenerate_content(prompt, max_tokens_gen, placeholder=placeholder, use_cache=use_cache), None
+    
+    async def aimprove_content(self, original_content, criticism, max_tokens=300, placeholder=None, use_cache=True):
         """Improve content based on criticism using Groq"""
         try:
-            if self.client is None:
+            if not self.api_key:
                 return self._template_based_improvement(original_content, criticism)
             
-            # Create a detailed prompt for content improvement
-            system_prompt = """You are a professional content editor and writer. Your job is to improve existing content based on specific criticism and feedback.
-            
-            Instructions:
-            - Carefully read the original content and the criticism provided
-            - Address all the specific issues mentioned in the criticism
-            - Maintain the original topic and intent while making improvements
-            - Enhance clarity, engagement, structure, and overall quality
-            - Keep the improved version within a similar length range
-            - Make the content more polished and professional"""
-            
-            user_prompt = f"""Please improve the following content based on the criticism provided:
-
-ORIGINAL CONTENT:
-{original_content}
+            # Fixed instructions first and the long draft last, so the cached prefix runs past the system prompt;
+            # only the critique's points are sent, not its intro, praise and sign-off
+            user_prompt = f"""Please improve the following content based on the criticism provided. Provide an improved version that addresses all the points mentioned in the criticism while maintaining the core message and topic.
 
 CRITICISM TO ADDRESS:
-{criticism}
+{condense_criticism(criticism)}
 
-Please provide an improved version that addresses all the points mentioned in the criticism while maintaining the core message and topic."""
+ORIGINAL CONTENT:
+{original_content}"""
             
             # Generate improved content using Groq
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
+            return await self._complete(
+                [
+                    {"role": "system", "content": EDITOR_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
-                model=self.model,
-                max_tokens=max_tokens,
+                max_tokens,
                 temperature=0.7,
-                top_p=0.9
+                placeholder=placeholder,
+                cache_key=(f"improve:{self.model}:{max_tokens}", f"{criticism}\0{original_content}") if use_cache else None
             )
             
-            # Extract improved content
-            improved_content = chat_completion.choices[0].message.content
-            return improved_content.strip()
-            
         except Exception as e:
-            st.error(f"Error improving content with Groq: {str(e)}")
+            report_api_error("Error improving content with Groq", e)
             return self._template_based_improvement(original_content, criticism)
     
     def _template_based_improvement(self, content, criticism):
@@ -129,16 +369,18 @@ Please provide an improved version that addresses all the points mentioned in th
         # Simple improvements based on common issues
         improved = content
         
+        criticism_lower = criticism.lower()
+        
         # Add more structure if needed
-        if "structure" in criticism.lower() or "organization" in criticism.lower():
+        if "structure" in criticism_lower or "organization" in criticism_lower:
             improved = f"# Introduction\n\n{improved}\n\n# Conclusion\n\nIn summary, this topic demonstrates important considerations for further exploration."
         
         # Add examples if mentioned in criticism
-        if "example" in criticism.lower() or "specific" in criticism.lower():
+        if "example" in criticism_lower or "specific" in criticism_lower:
             improved += "\n\n**Example:** This concept can be applied in real-world scenarios where practical implementation brings measurable benefits."
         
         # Add engagement elements
-        if "engaging" in criticism.lower() or "engagement" in criticism.lower():
+        if "engaging" in criticism_lower or "engagement" in criticism_lower:
             improved = improved.replace(".", ". This is particularly important because")
         
         return improved
@@ -155,93 +397,49 @@ Please provide an improved version that addresses all the points mentioned in th
         
         # Simple keyword matching for template selection
         prompt_lower = prompt.lower()
-        if any(word in prompt_lower for word in ['tech', 'ai', 'software', 'digital', 'computer', 'algorithm']):
+        if _TECHNOLOGY_TOPIC_RE.search(prompt_lower):
             return templates['technology']
-        elif any(word in prompt_lower for word in ['business', 'market', 'company', 'strategy', 'management']):
+        elif _BUSINESS_TOPIC_RE.search(prompt_lower):
             return templates['business']
         else:
             return templates['general']
 
-class CriticAgent:
-    def __init__(self, api_key=None):
-        try:
-            if not api_key:
-                self.client = None
-                return
-                
-            self.client = Groq(api_key=api_key)
-            self.model = "llama-3.1-8b-instant"
-            # Test the connection
-            self.client.models.list()
-            
-        except Exception as e:
-            st.error(f"❌ Error loading Critic Agent: {str(e)}")
-            self.client = None
-    
-    def analyze_content(self, content, max_tokens=400):
-        """Analyze and critique content using Groq"""
+class CriticAgent(GroqAgent):
+    async def aanalyze_content(self, content, max_tokens=400, placeholder=None):
+        """Analyze and critique content using Groq, streaming into placeholder when one is given"""
         try:
-            if self.client is None:
+            if not self.api_key:
                 return self._template_based_criticism(content)
             
-            # Create a detailed prompt for content analysis
-            system_prompt = """You are an expert content critic and editor. Your job is to provide comprehensive, constructive criticism of written content. 
-            
-            Analyze the content across these dimensions:
-            1. CLARITY & READABILITY: Is the writing clear and easy to understand?
-            2. STRUCTURE & ORGANIZATION: Is the content well-organized with logical flow?
-            3. ENGAGEMENT & TONE: Is it engaging and appropriate for the target audience?
-            4. ACCURACY & DEPTH: Does it provide valuable, accurate information?
-            5. COMPLETENESS: Are there missing elements or areas that need expansion?
-            
-            At the end of your analysis, provide a QUALITY SCORE from 1-10 where:
-            - 1-4: Poor quality, needs major improvements
-            - 5-6: Average quality, needs moderate improvements  
-            - 7-8: Good quality, minor improvements needed
-            - 9-10: Excellent quality, ready for publication
-            
-            Format your response with the score at the end like: "QUALITY SCORE: X/10"
-            
-            Provide specific, actionable feedback with examples. Be constructive and helpful, not just critical."""
-            
             user_prompt = f"Please analyze and critique this content in detail. Provide specific feedback on strengths, weaknesses, and suggestions for improvement:\n\n{content}"
             
             # Generate criticism using Groq
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
+            return await self._complete(
+                [
+                    {"role": "system", "content": CRITIC_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
-                model=self.model,
-                max_tokens=max_tokens,
-                temperature=0.7,
-                top_p=0.9
+                max_tokens, 0.7, placeholder,
+                cache_key=(f"analyze:{self.model}:{max_tokens}", content)
             )
             
-            # Extract criticism
-            criticism = chat_completion.choices[0].message.content
-            return criticism.strip()
-            
         except Exception as e:
-            st.error(f"Error analyzing content with Groq: {str(e)}")
+            report_api_error("Error analyzing content with Groq", e)
             return self._template_based_criticism(content)
     
     def extract_quality_score(self, criticism):
         """Extract quality score from criticism text"""
         try:
             # Look for quality score pattern
-            score_pattern = r"QUALITY SCORE:\s*(\d+(?:\.\d+)?)"
-            match = re.search(score_pattern, criticism, re.IGNORECASE)
+            match = _QUALITY_SCORE_RE.search(criticism)
             if match:
                 return float(match.group(1))
             
             # Fallback: analyze criticism sentiment for scoring
+            # Each distinct keyword counts once, matched as a whole word so "unclear" is not also "clear"
             criticism_lower = criticism.lower()
-            negative_words = ['poor', 'weak', 'lacking', 'needs improvement', 'unclear', 'confusing']
-            positive_words = ['excellent', 'great', 'good', 'clear', 'engaging', 'well-written']
-            
-            negative_count = sum(1 for word in negative_words if word in criticism_lower)
-            positive_count = sum(1 for word in positive_words if word in criticism_lower)
+            negative_count = len(set(_NEGATIVE_FEEDBACK_RE.findall(criticism_lower)))
+            positive_count = len(set(_POSITIVE_FEEDBACK_RE.findall(criticism_lower)))
             
             # Simple scoring based on word sentiment
             base_score = 5.0
@@ -265,9 +463,9 @@ class CriticAgent:
             base_score += 0.5
         
         # Structure scoring (basic checks)
-        if any(header in content for header in ['#', '##', '###']):
+        if '#' in content:
             base_score += 1.0
-        if len(content.split('\n\n')) >= 3:  # Multiple paragraphs
+        if content.count('\n\n') >= 2:  # Multiple paragraphs
             base_score += 0.5
         
         quality_score = min(10.0, base_score)
@@ -299,6 +497,13 @@ The content shows good potential with solid fundamentals. Implementing the sugge
 """
         return feedback
 
+# Bounded so every key typed into the sidebar (including rejected ones) does not pin a pair for the process lifetime
+@st.cache_resource(max_entries=8)
+def get_agents(api_key, use_cache=True):
+    """Generator and critic for api_key, shared across reruns and sessions"""
+    cache = get_response_cache() if use_cache else None
+    return ContentGeneratorAgent(api_key, cache=cache), CriticAgent(api_key, cache=cache)
+
 class SelfCriticSystem:
     def __init__(self):
         st.title("🤖 Self-Critic Agent System")
@@ -324,17 +529,20 @@ class SelfCriticSystem:
             This demonstrates how AI can autonomously improve its output through self-reflection and iteration!
             """)
         
-        # Session state for storing iterations
-        if 'iterations' not in st.session_state:
-            st.session_state.iterations = []
-        if 'current_content' not in st.session_state:
-            st.session_state.current_content = ""
-        if 'iterative_mode' not in st.session_state:
-            st.session_state.iterative_mode = True
-        if 'quality_threshold' not in st.session_state:
-            st.session_state.quality_threshold = 8.0
-        if 'max_iterations' not in st.session_state:
-            st.session_state.max_iterations = 5
+        # Session state for storing iterations, settings and token totals, filled in one pass
+        defaults = {
+            'iterations': deque(maxlen=MAX_STORED_ITERATIONS),
+            'current_content': "",
+            'iterative_mode': True,
+            'quality_threshold': 8.0,
+            'max_iterations': 5,
+            'num_drafts': 1,
+            'prompt_tokens': 0,
+            'cached_prompt_tokens': 0,
+            'api_key_rejected': False,
+        }
+        for key, value in defaults.items():
+            st.session_state.setdefault(key, value)
         
         # Initialize agents (will be created after API key is provided)
         self.generator = None
@@ -377,21 +585,18 @@ class SelfCriticSystem:
             """)
             return
         
-        # Initialize agents with API key
-        if self.generator is None or self.critic is None:
-            with st.spinner("🔄 Initializing AI agents..."):
-                self.generator = ContentGeneratorAgent(api_key)
-                self.critic = CriticAgent(api_key)
-                
-                # Check if agents loaded successfully
-                if self.generator.client and self.critic.client:
-                    st.sidebar.success("✅ Agents initialized successfully!")
-                else:
-                    st.sidebar.error("❌ Failed to initialize agents. Please check your API key.")
-                    if st.sidebar.button("🔄 Reset API Key"):
-                        del st.session_state.groq_api_key
-                        st.rerun()
-                    return
+        # Agents are built once per key and cache setting, not on every rerun;
+        # the key itself is checked by the first real request
+        self.generator, self.critic = get_agents(api_key, not st.session_state.get('bypass_cache'))
+        
+        if st.session_state.api_key_rejected:
+            st.sidebar.error("❌ Groq rejected this API key. Please check your API key.")
+            if st.sidebar.button("🔄 Reset API Key"):
+                del st.session_state.groq_api_key
+                st.session_state.api_key_rejected = False
+                st.rerun()
+            return
+        st.sidebar.success("✅ Agents initialized successfully!")
         
         # System controls sidebar
         st.sidebar.header("⚙️ System Controls")
@@ -404,6 +609,12 @@ class SelfCriticSystem:
             del st.session_state.groq_api_key
             st.rerun()
         
+        st.sidebar.checkbox(
+            "Bypass Response Cache",
+            key='bypass_cache',
+            help="Always call Groq instead of reusing a cached answer for the same prompt or draft"
+        )
+        
         # Iterative improvement settings
         st.sidebar.header("🔄 Iterative Settings")
         
@@ -430,31 +641,25 @@ class SelfCriticSystem:
                 value=st.session_state.max_iterations,
                 help="Maximum number of improvement iterations"
             )
+            
+            st.session_state.num_drafts = st.sidebar.slider(
+                "Drafts per Iteration",
+                min_value=1,
+                max_value=4,
+                value=st.session_state.num_drafts,
+                help="Write this many candidate drafts at once each iteration and keep the best-scoring one"
+            )
         
-        # Input section
-        st.header("📝 Content Generation")
-        prompt = st.text_area(
-            "Enter your topic or prompt:",
-            height=100,
-            placeholder="e.g., 'The future of artificial intelligence in healthcare'"
-        )
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            max_tokens_gen = st.slider("Generation Length", 150, 500, 300)
-        with col2:
-            max_tokens_crit = st.slider("Criticism Length", 200, 600, 400)
+        self.render_input_section()
         
-        # Generate button
-        button_text = "🚀 Generate & Iterate" if st.session_state.iterative_mode else "🚀 Generate & Analyze"
-        if st.button(button_text, type="primary"):
-            if prompt.strip():
-                if st.session_state.iterative_mode:
-                    self.iterative_improvement(prompt, max_tokens_gen, max_tokens_crit)
-                else:
-                    self.generate_and_analyze(prompt, max_tokens_gen, max_tokens_crit)
+        # Summary of the last iterative run, shown once after the rerun that ends it
+        run_summary = st.session_state.pop('run_summary', None)
+        if run_summary:
+            reached_threshold, message = run_summary
+            if reached_threshold:
+                st.success(message)
             else:
-                st.warning("⚠️ Please enter a prompt first!")
+                st.warning(message)
         
         # Display current iteration
         if st.session_state.current_content:
@@ -462,11 +667,19 @@ class SelfCriticSystem:
             st.markdown(st.session_state.current_content)
         
         # Display iterations history
-        if st.session_state.iterations:
+        iterations = st.session_state.iterations
+        if iterations:
             st.header("📚 Iteration History")
             
-            for i, iteration in enumerate(reversed(st.session_state.iterations), 1):
-                iteration_num = len(st.session_state.iterations) - i + 1
+            # Every expander is redrawn on each rerun, so only the newest page is shown unless asked
+            shown = iterations
+            if len(iterations) > HISTORY_PAGE_SIZE and not st.checkbox(
+                f"Show all {len(iterations)} iterations", key='show_all_iterations'
+            ):
+                shown = list(iterations)[-HISTORY_PAGE_SIZE:]
+            
+            first_shown = len(iterations) - len(shown) + 1
+            for iteration_num, iteration in reversed(list(enumerate(shown, first_shown))):
                 quality_score = iteration.get('quality_score', 5.0)
                 
                 # Color code iterations based on quality
@@ -485,9 +698,8 @@ class SelfCriticSystem:
                         st.subheader("Generated Content")
                         st.markdown(iteration['content'])
                         
-                        # Content metrics
-                        word_count = len(iteration['content'].split())
-                        st.metric("Word Count", word_count)
+                        # Content metrics (counted once when the iteration was stored)
+                        st.metric("Word Count", iteration['word_count'])
                         
                         # Show improvement type
                         if iteration.get('iteration_type'):
@@ -509,7 +721,7 @@ class SelfCriticSystem:
         # Clear history button
         if st.session_state.iterations:
             if st.sidebar.button("🗑️ Clear History"):
-                st.session_state.iterations = []
+                st.session_state.iterations.clear()
                 st.session_state.current_content = ""
                 st.rerun()
         
@@ -518,6 +730,12 @@ class SelfCriticSystem:
         st.sidebar.success("🟢 Generator: Ready")
         st.sidebar.success("🟢 Critic: Ready")
         
+        # Share of prompt tokens served from Groq's prompt cache
+        prompt_tokens = st.session_state.prompt_tokens
+        if prompt_tokens:
+            cached_share = st.session_state.cached_prompt_tokens / prompt_tokens
+            st.sidebar.info(f"⚡ Prompt Cache: {cached_share:.0%} of {prompt_tokens} prompt tokens")
+        
         # Show iteration statistics
         if st.session_state.iterations:
             total_iterations = len(st.session_state.iterations)
@@ -540,18 +758,61 @@ class SelfCriticSystem:
         else:
             st.sidebar.info("💾 No iterations yet")
     
-    def iterative_improvement(self, prompt, max_tokens_gen, max_tokens_crit):
-        """Generate content and iteratively improve it until quality threshold is met"""
+    @st.fragment
+    def render_input_section(self):
+        """Prompt, length sliders and generate button; editing these only reruns this fragment, not the history below"""
+        # Input section
+        st.header("📝 Content Generation")
+        prompt = st.text_area(
+            "Enter your topic or prompt:",
+            height=100,
+            placeholder="e.g., 'The future of artificial intelligence in healthcare'"
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            max_tokens_gen = st.slider("Generation Length", 150, 500, 300)
+        with col2:
+            max_tokens_crit = st.slider("Criticism Length", 200, 600, 400)
+        
+        # Generate button
+        button_text = "🚀 Generate & Iterate" if st.session_state.iterative_mode else "🚀 Generate & Analyze"
+        if st.button(button_text, type="primary"):
+            if prompt.strip():
+                if st.session_state.iterative_mode:
+                    run_async(self.iterative_improvement(
+                        prompt, max_tokens_gen, max_tokens_crit, st.session_state.num_drafts
+                    ))
+                else:
+                    run_async(self.generate_and_analyze(prompt, max_tokens_gen, max_tokens_crit))
+            else:
+                st.warning("⚠️ Please enter a prompt first!")
+    
+    async def _draft_and_review(self, draft, max_tokens_crit):
+        """
+        Await one candidate draft and critique it as soon as it is ready, so its
+        review overlaps the other candidates still being generated. The draft
+        coroutine returns either the text or a (text, criticism) pair
+        """
+        result = await draft
+        content, criticism = result if isinstance(result, tuple) else (result, None)
+        if content and criticism is None:
+            criticism = await self.critic.aanalyze_content(content, max_tokens_crit)
+        return content, criticism
+    
+    async def iterative_improvement(self, prompt, max_tokens_gen, max_tokens_crit, num_drafts=1):
+        """Generate content and iteratively improve it until quality threshold is met, keeping the best of num_drafts concurrent drafts per iteration"""
         
         # Check if agents are initialized
         if not self.generator or not self.critic:
             st.error("❌ AI agents not initialized. Please check your API key.")
             return
         
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        iteration_container = st.empty()
+        # Progress is one status container; the streamed draft and per-iteration scores appear inside it
+        status = st.status("🤖 Starting...", expanded=True)
+        with status:
+            draft_placeholder = st.empty()
+            iteration_container = st.empty()
         
         try:
             current_content = None
@@ -560,48 +821,61 @@ class SelfCriticSystem:
             max_iterations = st.session_state.max_iterations
             
             # Clear previous iterations for this run
-            st.session_state.iterations = []
+            st.session_state.iterations.clear()
             
             while iteration_count < max_iterations:
                 iteration_count += 1
-                progress_percentage = (iteration_count / max_iterations) * 100
                 
                 if iteration_count == 1:
                     # First iteration: Generate initial content
-                    status_text.text(f"🤖 Iteration {iteration_count}: Generating initial content...")
-                    progress_bar.progress(int(progress_percentage * 0.5))
+                    status.update(label=f"🤖 Iteration {iteration_count}/{max_iterations}: Generating and reviewing initial content...")
                     
-                    current_content = self.generator.generate_content(prompt, max_tokens_gen)
+                    # Drafts come with their own critique when the fused call works, saving a round trip.
+                    # Only the first draft is shown and cached; the others are extra samples
+                    drafts = [
+                        self.generator.agenerate_with_critique(
+                            prompt, max_tokens_gen, max_tokens_crit,
+                            placeholder=draft_placeholder if i == 0 else None, use_cache=i == 0
+                        )
+                        for i in range(num_drafts)
+                    ]
                     iteration_type = "Initial Generation"
                 else:
                     # Subsequent iterations: Improve based on criticism
-                    status_text.text(f"🔄 Iteration {iteration_count}: Improving content...")
-                    progress_bar.progress(int(progress_percentage * 0.5))
+                    status.update(label=f"🔄 Iteration {iteration_count}/{max_iterations}: Improving and reviewing content...")
                     
                     if previous_criticism:
-                        current_content = self.generator.improve_content(
-                            current_content, previous_criticism, max_tokens_gen
-                        )
+                        drafts = [
+                            self.generator.aimprove_content(
+                                current_content, previous_criticism, max_tokens_gen,
+                                placeholder=draft_placeholder if i == 0 else None, use_cache=i == 0
+                            )
+                            for i in range(num_drafts)
+                        ]
                         iteration_type = "Iterative Improvement"
                     else:
                         break
                 
-                if not current_content:
-                    st.error(f"❌ Failed to generate content in iteration {iteration_count}")
+                # Each draft is critiqued as soon as it finishes rather than after all of them
+                candidates = await asyncio.gather(*[
+                    self._draft_and_review(draft, max_tokens_crit) for draft in drafts
+                ])
+                candidates = [(draft, criticism) for draft, criticism in candidates if draft]
+                if not candidates:
+                    status.update(label=f"❌ Failed to generate content in iteration {iteration_count}", state="error")
                     return
                 
-                # Analyze the content
-                status_text.text(f"🔍 Iteration {iteration_count}: Analyzing content quality...")
-                progress_bar.progress(int(progress_percentage * 0.75))
-                
-                criticism = self.critic.analyze_content(current_content, max_tokens_crit)
+                scored = [
+                    (self.critic.extract_quality_score(criticism), draft, criticism)
+                    for draft, criticism in candidates if criticism
+                ]
                 
-                if not criticism:
-                    st.error(f"❌ Failed to analyze content in iteration {iteration_count}")
+                if not scored:
+                    status.update(label=f"❌ Failed to analyze content in iteration {iteration_count}", state="error")
                     return
                 
-                # Extract quality score
-                quality_score = self.critic.extract_quality_score(criticism)
+                # Keep the best-scoring draft
+                quality_score, current_content, criticism = max(scored, key=lambda candidate: candidate[0])
                 
                 # Determine if this is the final iteration
                 is_final = quality_score >= quality_threshold
@@ -611,70 +885,63 @@ class SelfCriticSystem:
                 iteration_data = {
                     'prompt': prompt,
                     'content': current_content,
+                    'word_count': len(current_content.split()),
                     'criticism': criticism,
                     'quality_score': quality_score,
                     'iteration_type': iteration_type,
                     'iteration_number': iteration_count,
                     'is_final': is_final,
                     'stopped_at_max': stopped_at_max,
-                    'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+                    'timestamp': time.strftime(TIMESTAMP_FORMAT)
                 }
                 
                 st.session_state.iterations.append(iteration_data)
                 st.session_state.current_content = current_content
                 
-                # Show live progress
-                with iteration_container.container():
-                    st.write(f"**Iteration {iteration_count}** - Quality Score: **{quality_score:.1f}/10**")
-                    if is_final:
-                        st.success(f"🎉 Quality threshold reached! ({quality_score:.1f} ≥ {quality_threshold})")
-                    elif iteration_count < max_iterations:
-                        st.info(f"🔄 Continuing to improve... (Target: {quality_threshold}/10)")
-                    
+                # Show live progress as a single element, one update per iteration
+                progress_line = f"**Iteration {iteration_count}** - Quality Score: **{quality_score:.1f}/10**"
+                if is_final:
+                    iteration_container.success(
+                        f"{progress_line}\n\n🎉 Quality threshold reached! ({quality_score:.1f} ≥ {quality_threshold})"
+                    )
+                elif iteration_count < max_iterations:
+                    iteration_container.info(f"{progress_line}\n\n🔄 Continuing to improve... (Target: {quality_threshold}/10)")
+                else:
+                    iteration_container.markdown(progress_line)
+                
                 # Store criticism for next iteration
                 previous_criticism = criticism
                 
-                # Check if we should stop
+                # Stop once the threshold is met; the loop condition handles max iterations.
+                # No closing status or 100% update: the rerun below replaces them with the summary at once
                 if is_final:
-                    status_text.text(f"✅ Complete! Quality threshold reached in {iteration_count} iterations")
-                    break
-                elif iteration_count >= max_iterations:
-                    status_text.text(f"⚠️ Reached maximum iterations ({max_iterations})")
                     break
-                
-                # Add a small delay to show progress
-                time.sleep(0.5)
-            
-            progress_bar.progress(100)
-            
-            # Show final summary
-            with iteration_container.container():
-                final_score = st.session_state.iterations[-1]['quality_score']
-                if final_score >= quality_threshold:
-                    st.success(f"🎉 **Successfully reached quality threshold!**")
-                    st.write(f"Final Score: **{final_score:.1f}/10** (Target: {quality_threshold}/10)")
-                    st.write(f"Iterations needed: **{iteration_count}**")
-                else:
-                    st.warning(f"⚠️ **Reached maximum iterations without meeting threshold**")
-                    st.write(f"Final Score: **{final_score:.1f}/10** (Target: {quality_threshold}/10)")
-                    st.write(f"Total Iterations: **{iteration_count}**")
-                    st.info("💡 Try lowering the quality threshold or increasing max iterations")
             
-            # Clear progress indicators after delay
-            time.sleep(2)
-            progress_bar.empty()
-            status_text.empty()
+            # Final summary, kept in session state so it is drawn after the rerun instead of
+            # holding the script for a moment before it
+            final_score = st.session_state.iterations[-1]['quality_score']
+            score_line = f"Final Score: **{final_score:.1f}/10** (Target: {quality_threshold}/10)"
+            if final_score >= quality_threshold:
+                st.session_state.run_summary = (True,
+                    f"🎉 **Successfully reached quality threshold!**\n\n{score_line}\n\n"
+                    f"Iterations needed: **{iteration_count}**"
+                )
+            else:
+                st.session_state.run_summary = (False,
+                    f"⚠️ **Reached maximum iterations without meeting threshold**\n\n{score_line}\n\n"
+                    f"Total Iterations: **{iteration_count}**\n\n"
+                    "💡 Try lowering the quality threshold or increasing max iterations"
+                )
             
-            # Force rerun to update the display
-            st.rerun()
+            # The rerun drops the status container by omission. It has to be app-wide rather than
+            # fragment-scoped, because the sidebar status and Clear History button live outside this fragment
+            st.rerun(scope="app")
             
         except Exception as e:
+            status.update(label="❌ Iterative improvement stopped", state="error", expanded=False)
             st.error(f"❌ Error during iterative improvement: {str(e)}")
-            progress_bar.empty()
-            status_text.empty()
-            iteration_container.empty()
     
-    def generate_and_analyze(self, prompt, max_tokens_gen, max_tokens_crit):
+    async def generate_and_analyze(self, prompt, max_tokens_gen, max_tokens_crit):
         """Generate content and analyze it (single iteration mode)"""
         
         # Check if agents are initialized
@@ -682,64 +949,56 @@ class SelfCriticSystem:
             st.error("❌ AI agents not initialized. Please check your API key.")
             return
         
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Progress is one status container holding the streamed draft and critique
+        status = st.status("🤖 Generating content...", expanded=True)
+        with status:
+            draft_placeholder = st.empty()
+            critique_placeholder = st.empty()
         
         try:
             # Step 1: Generate content
-            status_text.text("🤖 Generating content...")
-            progress_bar.progress(25)
-            
-            generated_content = self.generator.generate_content(prompt, max_tokens_gen)
+            generated_content = await self.generator.agenerate_content(
+                prompt, max_tokens_gen, placeholder=draft_placeholder
+            )
             
             if not generated_content:
-                st.error("❌ Failed to generate content")
+                status.update(label="❌ Failed to generate content", state="error")
                 return
             
-            progress_bar.progress(50)
-            
-            # Step 2: Analyze content
-            status_text.text("🔍 Analyzing content...")
-            progress_bar.progress(75)
+            # Step 2: Analyze content, streaming the critique below the finished draft
+            status.update(label="🔍 Analyzing content...")
             
-            criticism = self.critic.analyze_content(generated_content, max_tokens_crit)
+            criticism = await self.critic.aanalyze_content(
+                generated_content, max_tokens_crit, placeholder=critique_placeholder
+            )
             
             if not criticism:
-                st.error("❌ Failed to analyze content")
+                status.update(label="❌ Failed to analyze content", state="error")
                 return
             
             # Extract quality score
             quality_score = self.critic.extract_quality_score(criticism)
             
-            progress_bar.progress(100)
-            status_text.text("✅ Complete!")
-            
             # Store iteration
             iteration_data = {
                 'prompt': prompt,
                 'content': generated_content,
+                'word_count': len(generated_content.split()),
                 'criticism': criticism,
                 'quality_score': quality_score,
                 'iteration_type': "Single Generation",
-                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+                'timestamp': time.strftime(TIMESTAMP_FORMAT)
             }
             
             st.session_state.iterations.append(iteration_data)
             st.session_state.current_content = generated_content
             
-            # Clear progress indicators after a short delay
-            time.sleep(1)
-            progress_bar.empty()
-            status_text.empty()
-            
-            # Force rerun to update the display
-            st.rerun()
+            # App-wide rerun (see iterative_improvement); it also drops the status container
+            st.rerun(scope="app")
             
         except Exception as e:
+            status.update(label="❌ Generation stopped", state="error", expanded=False)
             st.error(f"❌ Error during generation and analysis: {str(e)}")
-            progress_bar.empty()
-            status_text.empty()
 
 def main():
     # Page configuration
@@ -751,22 +1010,7 @@ def main():
     )
     
     # Custom CSS for better styling
-    st.markdown("""
-    <style>
-    .main > div {
-        padding-top: 1rem;
-    }
-    .stAlert {
-        margin-top: 1rem;
-    }
-    .metric-container {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin: 0.5rem 0;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(APP_CSS, unsafe_allow_html=True)
     
     # Initialize and run the system
     system = SelfCriticSystem()
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+def _default_path():
+    """The cache file in a per-user data directory that only its owner can open"""
+    directory = os.path.join(os.path.expanduser('~'), '.cache', 'self_critic_agent')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, 'responses.sqlite3')
+
+class ResponseCache:
+    """
+    On-disk cache of Groq responses, one SQLite table shared by all sessions.
+    Entries are keyed by a namespace (which call, model and token budget) plus
+    the request text, so re-running a prompt or re-critiquing an unchanged
+    draft skips the API round trip. Topic prompts (the generate* namespaces)
+    are matched with case and whitespace normalized; drafts are matched
+    verbatim, since their line breaks are part of what gets critiqued.
+    Expired entries, and all but the newest max_entries, are pruned on write.
+    The file lives at path, else $SELF_CRITIC_CACHE, else under ~/.cache/self_critic_agent.
+    """
+
+    def __init__(self, path=None, ttl_seconds=24 * 60 * 60, max_entries=1000):
+        self.path = path or os.getenv('SELF_CRITIC_CACHE') or _default_path()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Cached answers are served as if they came from Groq, so only the owner may write them
+        os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+        # Streamlit reruns may land on different threads; the lock serializes access
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+            self._prune()
+
+    @staticmethod
+    def _key(namespace, text):
+        if namespace.startswith('generate'):
+            text = ' '.join(text.lower().split())
+        return hashlib.sha256(f"{namespace}\0{text}".encode()).hexdigest()
+
+    def get(self, namespace, text):
+        """Cached response for text under namespace, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created > ?",
+                (self._key(namespace, text), time.time() - self.ttl_seconds)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, namespace, text, response):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (self._key(namespace, text), response, time.time())
+            )
+            self._prune()
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM responses WHERE created <= ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key NOT IN "
+            "(SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+            (self.max_entries,)
+        )
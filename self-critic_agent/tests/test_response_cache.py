@@ -0,0 +1,112 @@
+"""
+Tests for ResponseCache: key normalization, namespaces, TTL expiry, pruning, persistence and file privacy
+"""
+
+import os
+import stat
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_cache
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return ResponseCache(path=str(tmp_path / "responses.sqlite3"), **kwargs), clock
+
+
+def test_key_ignores_case_and_whitespace(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("generate", "AI in  Healthcare\n", "draft")
+    assert cache.get("generate", "ai in healthcare") == "draft"
+    assert cache.get("generate", "AI in finance") is None
+
+
+def test_drafts_are_keyed_verbatim(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("analyze:model:300", "Line one.\nLine two.", "critique")
+    assert cache.get("analyze:model:300", "Line one.\nLine two.") == "critique"
+    assert cache.get("analyze:model:300", "line one. line two.") is None
+    cache.put("improve:model:300", "Fix tone.\0Draft text", "improved")
+    assert cache.get("improve:model:300", "fix tone.\0draft  text") is None
+
+
+def test_namespaces_are_separate(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("generate:model:300", "topic", "draft")
+    assert cache.get("analyze:model:300", "topic") is None
+    assert cache.get("generate:model:400", "topic") is None
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.put("generate", "topic", "draft")
+    clock.now += 59
+    assert cache.get("generate", "topic") == "draft"
+    clock.now += 1
+    assert cache.get("generate", "topic") is None
+
+
+def test_expired_entries_are_pruned_on_write(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.put("generate", "old", "draft")
+    clock.now += 61
+    cache.put("generate", "new", "draft")
+    (rows,) = cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+    assert rows == 1
+
+
+def test_only_newest_entries_are_kept(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    for topic in ("a", "b", "c"):
+        cache.put("generate", topic, f"draft {topic}")
+        clock.now += 1
+    assert cache.get("generate", "a") is None
+    assert cache.get("generate", "b") == "draft b"
+    assert cache.get("generate", "c") == "draft c"
+
+
+def test_rewriting_an_entry_refreshes_it(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    cache.put("generate", "a", "first")
+    clock.now += 1
+    cache.put("generate", "b", "draft b")
+    clock.now += 1
+    cache.put("generate", "a", "second")
+    clock.now += 1
+    cache.put("generate", "c", "draft c")
+    assert cache.get("generate", "a") == "second"
+    assert cache.get("generate", "b") is None
+
+
+def test_entries_survive_reopening(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("generate", "topic", "draft")
+    reopened = ResponseCache(path=cache.path)
+    assert reopened.get("generate", "topic") == "draft"
+
+
+def test_default_file_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("SELF_CRITIC_CACHE", raising=False)
+    cache = ResponseCache()
+    assert cache.path.startswith(str(tmp_path))
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache.path)).st_mode) == 0o700
+
+
+def test_path_from_environment(tmp_path, monkeypatch):
+    path = str(tmp_path / "custom.sqlite3")
+    monkeypatch.setenv("SELF_CRITIC_CACHE", path)
+    assert ResponseCache().path == path